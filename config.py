@@ -23,6 +23,19 @@ class Config:
     DEFAULT_TIMEFRAME = int(os.getenv('DEFAULT_TIMEFRAME', '30'))
     MAX_CONCURRENT_REQUESTS = int(os.getenv('MAX_CONCURRENT_REQUESTS', '5'))
     CACHE_DURATION = int(os.getenv('CACHE_DURATION', '3600'))
+    GEMINI_MAX_CONCURRENCY = int(os.getenv('GEMINI_MAX_CONCURRENCY', '20'))  # In-flight Gemini requests per event loop
+    GEMINI_QPM = int(os.getenv('GEMINI_QPM', '1000'))  # Gemini requests per minute across the process (free tier: 15)
+    DECISION_CACHE_SCORE_BUCKET = float(os.getenv('DECISION_CACHE_SCORE_BUCKET', '5'))  # Score points treated as equal when reusing decisions (0 = exact prompts only)
+    GEMINI_CACHE_PATH = os.getenv('GEMINI_CACHE_PATH', '.cache/gemini_cache.sqlite')  # On-disk cache for search terms and summaries (empty = disabled)
+    GEMINI_CACHE_TTL = int(os.getenv('GEMINI_CACHE_TTL', '86400'))  # seconds
+    ANALYSIS_CACHE_ENABLED = os.getenv('ANALYSIS_CACHE_ENABLED', 'true').lower() == 'true'  # Reuse recent pipeline stage results across runs
+    ANALYSIS_CACHE_DIR = os.getenv('ANALYSIS_CACHE_DIR', '.cache')
+    # Seconds each analysis stage result stays reusable
+    ANALYSIS_CACHE_TTLS = {
+        'news': 3600,
+        'sentiment': 3600,
+        'data': 86400
+    }
     
     # Database Configuration
     DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///financial_analyzer.db')
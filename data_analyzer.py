@@ -5,7 +5,7 @@ Scrapes and analyzes historical price data and trends
 import yfinance as yf
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Tuple, Optional
 import requests
 import json
@@ -93,7 +93,7 @@ class CommodityDataAnalyzer:
                 'support_resistance': support_resistance,
                 'trend_score': trend_score,
                 'summary_statistics': summary_stats,
-                'analysis_timestamp': datetime.now().isoformat()
+                'analysis_timestamp': datetime.now(timezone.utc).isoformat()
             }
             
         except Exception as e:
@@ -650,5 +650,5 @@ class CommodityDataAnalyzer:
             'timeframe_days': 0,
             'data_points': 0,
             'error': error_message,
-            'analysis_timestamp': datetime.now().isoformat()
+            'analysis_timestamp': datetime.now(timezone.utc).isoformat()
         }
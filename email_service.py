@@ -1,32 +1,159 @@
 """
 Email Service for Sending Trading Recommendations to Brokers
 """
-import smtplib
+import asyncio
+import aiosmtplib
 import ssl
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
 from email import encoders
-from datetime import datetime
-from typing import Dict, List, Optional
+from datetime import datetime, timezone
+from functools import lru_cache, partial
+from typing import Callable, Dict, List, Optional, Tuple
 import logging
 import json
-import pandas as pd
-from io import StringIO
 from config import Config
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Static prompt and email fragments (no per-call interpolation needed)
+_REQUIREMENTS_CORE = """
+        
+        Requirements:
+        1. Write as a client placing an actual trading order with their broker
+        2. Address Ujjwal professionally but personally
+        3. Be direct and clear about the order you want to place
+        4. Include specific order details and reasoning
+        5. Sound confident but not arrogant
+        6. Keep it concise and actionable
+        7. End with "Best regards, FinSys acting on behalf of Ujjwal"
+        8. Use natural, conversational language
+        9. Make it sound like a real client-broker communication
+        10. EXPLAIN WHY the decision was made - include specific reasons based on the analysis
+        11. Reference the key metrics (sentiment score, trend score, price movement) in your explanation
+        12. Make the decision rationale clear and compelling"""
+
+_REQUIREMENTS_TIMEFRAME = """
+        14. Explain why this timeframe is optimal for the current market conditions
+        15. Include timeframe-specific risk considerations and exit strategy"""
+
+_REQUIREMENTS_PORTFOLIO = """
+        16. ALWAYS reference current portfolio context and holdings
+        17. Include recommendations for selling existing positions if it makes sense
+        18. Explain how this trade fits into overall portfolio strategy
+        19. Comment on portfolio diversification and risk management"""
+
+_REQUIREMENTS_NO_PORTFOLIO = """
+        16. Focus on the standalone trade opportunity without portfolio context
+        17. Emphasize the individual asset's potential and market conditions"""
+
+_PROMPT_TAIL = """
+        
+        Write the email body only (no subject line):
+        """
+
+_SIGN_OFF = """
+Best regards,
+FinSys acting on behalf of Ujjwal
+"""
+
+_DISCLAIMER = """
+---
+DISCLAIMER: This analysis is generated by an automated system. Please conduct your own 
+due diligence before executing any trades. All trading involves risk of loss.
+"""
+
+# Order-focused subject lines keyed by decision (anything else is treated as HOLD)
+_SUBJECT_TEMPLATES = {
+    'BUY': "Order Request: BUY {commodity} - ${price:.2f}",
+    'SELL': "Order Request: SELL {commodity} - ${price:.2f}",
+    'HOLD': "Portfolio Update: HOLD {commodity} - ${price:.2f}"
+}
+
+@lru_cache(maxsize=128)
+def _make_subject_fn(commodity: str) -> Callable[[str, float], str]:
+    """Build a subject formatter with the commodity name already bound"""
+    commodity_upper = commodity.upper()
+    formatters = {
+        decision: partial(template.format, commodity=commodity_upper)
+        for decision, template in _SUBJECT_TEMPLATES.items()
+    }
+    hold_formatter = formatters['HOLD']
+    
+    def subject_fn(decision: str, price: float) -> str:
+        return formatters.get(decision, hold_formatter)(price=price)
+    
+    return subject_fn
+
+class SMTPBatchAborted(Exception):
+    """Raised when sustained SMTP failures make the rest of a batch pointless"""
+    pass
+
 class EmailService:
     """
     Service for sending trading recommendations via email
     """
     
+    # Fail-fast thresholds for batched sends
+    BATCH_ABORT_MIN_SIZE = 30  # Only apply the failure ratio rule to batches this large
+    BATCH_ABORT_FAILURE_RATIO = 1 / 3
+    MAX_FAIL_STREAK = 5
+    
     def __init__(self, gemini_advisor=None):
         self.config = Config()
         self.gemini_advisor = gemini_advisor
         self._validate_email_config()
+        self._reset_batch_counters()
+        
+        # Reusable SMTP connection (bound to the event loop that opened it)
+        self._ssl_context = ssl.create_default_context()
+        self._aiosmtp = None
+        self._smtp_lock = None
+        self._smtp_loop = None
+    
+    def _reset_batch_counters(self, expected_size: int = 0):
+        """Reset SMTP failure tracking"""
+        self._batch_size = expected_size
+        self._batch_attempts = 0
+        self._batch_failures = 0
+        self._fail_streak = 0
+        self._batch_aborted = False
+    
+    def begin_batch(self, expected_size: int):
+        """
+        Start tracking SMTP failures for a batch of sends
+        
+        Args:
+            expected_size: Number of emails the batch is expected to send
+        """
+        self._reset_batch_counters(expected_size)
+    
+    async def close(self):
+        """End the current batch, reset failure tracking and drop the SMTP connection"""
+        self._reset_batch_counters()
+        await self._disconnect()
+    
+    async def _disconnect(self):
+        """Log out of and close the shared SMTP connection, if one is open"""
+        client, self._aiosmtp = self._aiosmtp, None
+        if client is not None and client.is_connected:
+            try:
+                await client.quit()
+            except Exception as e:
+                logger.warning("Error closing SMTP connection: %s", e)
+                client.close()
+    
+    def _should_abort_batch(self) -> bool:
+        """Check whether SMTP failures have crossed the fail-fast thresholds"""
+        if self._fail_streak >= self.MAX_FAIL_STREAK:
+            return True
+        
+        return (
+            self._batch_size >= self.BATCH_ABORT_MIN_SIZE and
+            self._batch_failures / self._batch_size >= self.BATCH_ABORT_FAILURE_RATIO
+        )
     
     def _validate_email_config(self):
         """Validate email configuration"""
@@ -58,14 +185,17 @@ class EmailService:
             # Skip sending emails for HOLD positions
             decision = trading_decision.get('decision', 'HOLD')
             if decision == 'HOLD':
-                logger.info(f"Skipping email for {trading_decision.get('commodity', 'Unknown')} - HOLD position")
+                logger.info("Skipping email for %s - HOLD position", trading_decision.get('commodity', 'Unknown'))
                 return {
                     'success': True,
                     'message': 'Email skipped for HOLD position',
                     'decision': decision
                 }
             
-            logger.info(f"Sending trading recommendation for {trading_decision.get('commodity', 'Unknown')}")
+            if self._batch_aborted:
+                raise SMTPBatchAborted("Email batch aborted after sustained SMTP failures")
+            
+            logger.info("Sending trading recommendation for %s", trading_decision.get('commodity', 'Unknown'))
             
             # Create email content
             email_subject = self._create_email_subject(trading_decision, data_analysis)
@@ -82,7 +212,7 @@ class EmailService:
                 msg.attach(analysis_attachment)
             
             # Send email
-            send_result = self._send_email(msg)
+            send_result = await self._send_email_async(msg)
             
             return {
                 'status': 'success' if send_result else 'failed',
@@ -90,45 +220,80 @@ class EmailService:
                 'decision': trading_decision.get('decision', 'HOLD'),
                 'recipient': self.config.BROKER_EMAIL,
                 'subject': email_subject,
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': datetime.now(timezone.utc).isoformat(),
                 'error': None if send_result else 'Failed to send email'
             }
             
+        except SMTPBatchAborted:
+            raise
         except Exception as e:
-            logger.error(f"Error sending trading recommendation: {e}")
+            logger.error("Error sending trading recommendation: %s", e)
             return {
                 'status': 'error',
                 'commodity': trading_decision.get('commodity', 'Unknown'),
                 'error': str(e),
-                'timestamp': datetime.now().isoformat()
+                'timestamp': datetime.now(timezone.utc).isoformat()
             }
+
+    async def send_batch(self, recommendations: List[Tuple[Dict, Dict, Dict]]) -> List[Dict]:
+        """
+        Send several trading recommendations back to back over one SMTP connection
+
+        Args:
+            recommendations: (trading_decision, sentiment_analysis, data_analysis) tuples
+
+        Returns:
+            Send results, in the same order as recommendations
+        """
+        self.begin_batch(len(recommendations))
+        results = []
+
+        try:
+            for trading_decision, sentiment_analysis, data_analysis in recommendations:
+                try:
+                    results.append(await self.send_trading_recommendation(
+                        trading_decision, sentiment_analysis, data_analysis
+                    ))
+                except SMTPBatchAborted as e:
+                    logger.warning("Skipping email for %s: %s", trading_decision.get('commodity', 'Unknown'), e)
+                    results.append({'status': 'aborted', 'error': str(e)})
+        finally:
+            await self.close()
+
+        return results
+
+    def make_subject_fn(self, commodity: str) -> Callable[[str, float], str]:
+        """
+        Get a subject line formatter specialized for a commodity
+        
+        Args:
+            commodity: Commodity name
+            
+        Returns:
+            Callable taking (decision, current_price) and returning the subject line
+        """
+        return _make_subject_fn(commodity)
     
     def _create_email_subject(self, trading_decision: Dict, data_analysis: Dict = None) -> str:
         """Create email subject line"""
-        commodity = trading_decision.get('commodity', 'Unknown').upper()
+        # Use Gemini's subject if available, otherwise create one
+        if trading_decision.get('email_subject'):
+            return trading_decision['email_subject']
+        
         decision = trading_decision.get('decision', 'HOLD')
-        confidence = trading_decision.get('confidence', 0.0)
         
         # Get current price from data analysis if available
         current_price = 0.0
         if data_analysis:
             current_price = data_analysis.get('current_price', 0.0)
         
-        # Use Gemini's subject if available, otherwise create one
-        if 'email_subject' in trading_decision and trading_decision['email_subject']:
-            return trading_decision['email_subject']
-        
         # Generate order-focused subject line
-        if decision == 'BUY':
-            return f"Order Request: BUY {commodity} - ${current_price:.2f}"
-        elif decision == 'SELL':
-            return f"Order Request: SELL {commodity} - ${current_price:.2f}"
-        else:
-            return f"Portfolio Update: HOLD {commodity} - ${current_price:.2f}"
+        subject_fn = self.make_subject_fn(trading_decision.get('commodity', 'Unknown'))
+        return subject_fn(decision, current_price)
     
-    def _generate_human_email_content(self, trading_decision: Dict, 
-                                    sentiment_analysis: Dict, 
-                                    data_analysis: Dict) -> str:
+    async def _generate_human_email_content(self, trading_decision: Dict, 
+                                          sentiment_analysis: Dict, 
+                                          data_analysis: Dict) -> str:
         """Generate human-like email content using Gemini AI"""
         
         commodity = trading_decision.get('commodity', 'Unknown').upper()
@@ -191,48 +356,23 @@ class EmailService:
         - Risk Impact: {risk_impact}
         - Current Portfolio Value: ${total_portfolio_value}"""
         
-        prompt += f"""
-        
-        Requirements:
-        1. Write as a client placing an actual trading order with their broker
-        2. Address Ujjwal professionally but personally
-        3. Be direct and clear about the order you want to place
-        4. Include specific order details and reasoning
-        5. Sound confident but not arrogant
-        6. Keep it concise and actionable
-        7. End with "Best regards, FinSys acting on behalf of Ujjwal"
-        8. Use natural, conversational language
-        9. Make it sound like a real client-broker communication
-        10. EXPLAIN WHY the decision was made - include specific reasons based on the analysis
-        11. Reference the key metrics (sentiment score, trend score, price movement) in your explanation
-        12. Make the decision rationale clear and compelling
-        13. EMPHASIZE the {timeframe_days}-day trading timeframe and how it affects the strategy
-        14. Explain why this timeframe is optimal for the current market conditions
-        15. Include timeframe-specific risk considerations and exit strategy"""
-
-        # Add portfolio-specific requirements only if we have portfolio data
-        if has_portfolio_data:
-            prompt += f"""
-        16. ALWAYS reference current portfolio context and holdings
-        17. Include recommendations for selling existing positions if it makes sense
-        18. Explain how this trade fits into overall portfolio strategy
-        19. Comment on portfolio diversification and risk management"""
-        else:
-            prompt += f"""
-        16. Focus on the standalone trade opportunity without portfolio context
-        17. Emphasize the individual asset's potential and market conditions"""
-        
-        prompt += f"""
-        
-        Write the email body only (no subject line):
-        """
+        # Add requirements (portfolio-specific ones only if we have portfolio data)
+        prompt = "".join([
+            prompt,
+            _REQUIREMENTS_CORE,
+            f"""
+        13. EMPHASIZE the {timeframe_days}-day trading timeframe and how it affects the strategy""",
+            _REQUIREMENTS_TIMEFRAME,
+            _REQUIREMENTS_PORTFOLIO if has_portfolio_data else _REQUIREMENTS_NO_PORTFOLIO,
+            _PROMPT_TAIL
+        ])
         
         try:
-            # Use Gemini to generate the email content (synchronous call to avoid event loop issues)
-            response = self.gemini_advisor.model.generate_content(prompt)
+            # Use Gemini to generate the email content (synchronous SDK call, run on the advisor's worker pool)
+            response = await self.gemini_advisor.generate_content_in_pool(prompt)
             return response.text.strip()
         except Exception as e:
-            logger.error(f"Error generating email content with Gemini: {e}")
+            logger.error("Error generating email content with Gemini: %s", e)
             return self._create_fallback_email_body(trading_decision, sentiment_analysis, data_analysis)
     
     def _create_fallback_email_body(self, trading_decision: Dict, 
@@ -296,13 +436,10 @@ After conducting a comprehensive analysis of market sentiment and technical indi
 • Asset Exposure: {portfolio_adjustments.get('asset_exposure', 'N/A')}
 • Recommended Actions: {portfolio_adjustments.get('sell_recommendations', 'Consider current holdings for rebalancing')}"""
 
-        email_body += f"""
+        email_body += """
 
 Please review the detailed analysis and let me know if you have any questions or need clarification on the recommendation.
-
-Best regards,
-FinSys acting on behalf of Ujjwal
-"""
+""" + _SIGN_OFF
         
         return email_body
     
@@ -317,11 +454,11 @@ FinSys acting on behalf of Ujjwal
         # Generate human-like email content using Gemini
         if self.gemini_advisor:
             try:
-                gemini_body = self._generate_human_email_content(
+                gemini_body = await self._generate_human_email_content(
                     trading_decision, sentiment_analysis, data_analysis
                 )
             except Exception as e:
-                logger.warning(f"Failed to generate Gemini email content: {e}")
+                logger.warning("Failed to generate Gemini email content: %s", e)
                 gemini_body = "Please see detailed analysis below."
         else:
             gemini_body = "Please see detailed analysis below."
@@ -405,15 +542,12 @@ Price Movement: {price_change:+.2f}%
 """
         
         # Add order confirmation request
-        email_body += f"""
+        email_body += """
 
 ---
 Please confirm this order and let me know if you need any additional information.
 I'm available to discuss the position sizing and risk management if needed.
-
-Best regards,
-FinSys acting on behalf of Ujjwal
-"""
+""" + _SIGN_OFF
         
         return email_body
     
@@ -438,7 +572,7 @@ FinSys acting on behalf of Ujjwal
                 'trading_recommendation': trading_decision,
                 'sentiment_analysis': sentiment_analysis,
                 'technical_analysis': data_analysis,
-                'generated_timestamp': datetime.now().isoformat()
+                'generated_timestamp': datetime.now(timezone.utc).isoformat()
             }
             
             # Convert to JSON string
@@ -460,40 +594,87 @@ FinSys acting on behalf of Ujjwal
             return attachment
             
         except Exception as e:
-            logger.error(f"Error creating analysis attachment: {e}")
+            logger.error("Error creating analysis attachment: %s", e)
             return None
     
-    def _send_email(self, msg: MIMEMultipart) -> bool:
-        """Send email via SMTP"""
+    async def _get_smtp_client(self) -> aiosmtplib.SMTP:
+        """Get a connected, authenticated SMTP client, reusing the open one if possible"""
+        loop = asyncio.get_running_loop()
+        if self._smtp_loop is not loop:
+            # Connections and locks cannot be shared across event loops; the old loop may
+            # already be closed, so drop the old connection's transport without a QUIT
+            if self._aiosmtp is not None:
+                try:
+                    self._aiosmtp.close()
+                except Exception as e:
+                    logger.debug("Error closing SMTP connection from a previous event loop: %s", e)
+                self._aiosmtp = None
+            self._smtp_lock = asyncio.Lock()
+            self._smtp_loop = loop
+        
+        async with self._smtp_lock:
+            if self._aiosmtp is None or not self._aiosmtp.is_connected:
+                # Use SSL for Zoho Mail (port 465) or STARTTLS for other providers (port 587)
+                use_tls = self.config.SMTP_PORT == 465
+                client = aiosmtplib.SMTP(
+                    hostname=self.config.SMTP_SERVER,
+                    port=self.config.SMTP_PORT,
+                    use_tls=use_tls,
+                    start_tls=not use_tls,
+                    tls_context=self._ssl_context
+                )
+                await client.connect()
+                await client.login(self.config.EMAIL_ADDRESS, self.config.EMAIL_PASSWORD)
+                self._aiosmtp = client
+        
+        return self._aiosmtp
+    
+    async def _send_email_async(self, msg: MIMEMultipart) -> bool:
+        """Send email via SMTP without blocking the event loop"""
+        if self._batch_aborted:
+            raise SMTPBatchAborted("Email batch aborted after sustained SMTP failures")
+        
+        self._batch_attempts += 1
+        
         try:
-            # Create SMTP session
-            context = ssl.create_default_context()
-            
-            # Use SSL for Zoho Mail (port 465) or STARTTLS for other providers (port 587)
-            if self.config.SMTP_PORT == 465:
-                # SSL connection for Zoho Mail
-                with smtplib.SMTP_SSL(self.config.SMTP_SERVER, self.config.SMTP_PORT, context=context) as server:
-                    server.login(self.config.EMAIL_ADDRESS, self.config.EMAIL_PASSWORD)
-                    
-                    # Send email
-                    text = msg.as_string()
-                    server.sendmail(self.config.EMAIL_ADDRESS, self.config.BROKER_EMAIL, text)
-            else:
-                # STARTTLS connection for other providers
-                with smtplib.SMTP(self.config.SMTP_SERVER, self.config.SMTP_PORT) as server:
-                    server.starttls(context=context)  # Enable security
-                    server.login(self.config.EMAIL_ADDRESS, self.config.EMAIL_PASSWORD)
-                    
-                    # Send email
-                    text = msg.as_string()
-                    server.sendmail(self.config.EMAIL_ADDRESS, self.config.BROKER_EMAIL, text)
-            
-            logger.info(f"Email sent successfully to {self.config.BROKER_EMAIL}")
+            client = await self._get_smtp_client()
+            try:
+                await client.send_message(
+                    msg, sender=self.config.EMAIL_ADDRESS, recipients=[self.config.BROKER_EMAIL]
+                )
+            except (aiosmtplib.SMTPServerDisconnected, ConnectionError) as e:
+                # The server may have dropped the idle shared connection; reconnect once and resend
+                logger.info("SMTP connection lost (%s), reconnecting", e)
+                self._aiosmtp = None
+                client = await self._get_smtp_client()
+                await client.send_message(
+                    msg, sender=self.config.EMAIL_ADDRESS, recipients=[self.config.BROKER_EMAIL]
+                )
+            
+            logger.info("Email sent successfully to %s", self.config.BROKER_EMAIL)
+            self._fail_streak = 0
             return True
             
         except Exception as e:
-            logger.error(f"Error sending email: {e}")
+            logger.error("Error sending email: %s", e)
+            # Force a fresh connection on the next attempt
+            self._aiosmtp = None
+            self._batch_failures += 1
+            self._fail_streak += 1
+            
+            # Outside a batch (begin_batch not called) a failure is just reported to the caller
+            if self._batch_size > 0 and self._should_abort_batch():
+                self._batch_aborted = True
+                raise SMTPBatchAborted(
+                    f"Aborting email batch after {self._batch_failures} failures "
+                    f"({self._fail_streak} consecutive)"
+                ) from e
             return False
+        
+        finally:
+            # Only batches keep the connection open between sends
+            if self._batch_size == 0:
+                await self._disconnect()
     
     async def send_market_summary_email(self, market_summary: Dict, 
                                       commodity_analyses: List[Dict]) -> Dict:
@@ -523,7 +704,7 @@ FinSys acting on behalf of Ujjwal
                 msg.attach(summary_attachment)
             
             # Send email
-            send_result = self._send_email(msg)
+            send_result = await self._send_email_async(msg)
             
             return {
                 'status': 'success' if send_result else 'failed',
@@ -531,17 +712,17 @@ FinSys acting on behalf of Ujjwal
                 'commodities_count': len(commodity_analyses),
                 'recipient': self.config.BROKER_EMAIL,
                 'subject': subject,
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': datetime.now(timezone.utc).isoformat(),
                 'error': None if send_result else 'Failed to send email'
             }
             
         except Exception as e:
-            logger.error(f"Error sending market summary email: {e}")
+            logger.error("Error sending market summary email: %s", e)
             return {
                 'status': 'error',
                 'type': 'market_summary',
                 'error': str(e),
-                'timestamp': datetime.now().isoformat()
+                'timestamp': datetime.now(timezone.utc).isoformat()
             }
     
     def _create_summary_subject(self, market_summary: Dict, commodity_analyses: List[Dict]) -> str:
@@ -664,12 +845,8 @@ Please review these recommendations and execute trades according to your risk ma
 
 Best regards,
 Automated Commodity Analysis System
-Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}
-
----
-DISCLAIMER: This analysis is generated by an automated system. Please conduct your own 
-due diligence before executing any trades. All trading involves risk of loss.
-"""
+Generated: {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')}
+""" + _DISCLAIMER
         
         return email_body
     
@@ -681,7 +858,7 @@ due diligence before executing any trades. All trading involves risk of loss.
             report_data = {
                 'market_summary': market_summary,
                 'individual_analyses': commodity_analyses,
-                'generated_timestamp': datetime.now().isoformat(),
+                'generated_timestamp': datetime.now(timezone.utc).isoformat(),
                 'total_commodities': len(commodity_analyses)
             }
             
@@ -703,5 +880,5 @@ due diligence before executing any trades. All trading involves risk of loss.
             return attachment
             
         except Exception as e:
-            logger.error(f"Error creating summary attachment: {e}")
+            logger.error("Error creating summary attachment: %s", e)
             return None
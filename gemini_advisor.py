@@ -3,26 +3,752 @@ Gemini AI Integration for Commodity Trading Decisions
 Analyzes sentiment and data to make buy/sell/hold recommendations
 """
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+import asyncio
+import copy
+import hashlib
+import heapq
+import itertools
 import json
 import logging
-from typing import Dict, List, Optional
-from datetime import datetime
+import operator
+import re
+import threading
+import types
+import weakref
+import orjson
+from cachetools import TTLCache
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from typing import Dict, List, Mapping, Optional, Tuple
+from datetime import datetime, timezone
 from config import Config
-from models import db, Portfolio, Holding
-from auth_service import AuthService
+from flask import current_app, has_app_context
+from sqlalchemy import and_, func, select
+from models import db, User, Portfolio, Holding
+from utils import AIAnalysisError, CircuitBreaker, PersistentCache, RateLimiter, retry_on_failure
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Prompt guidance for each risk tolerance level (read-only, shared by every prompt)
+_RISK_TOLERANCE_DESCRIPTIONS = types.MappingProxyType({
+    'conservative': """
+- Prioritize capital preservation over growth
+- Prefer stable, dividend-paying assets with low volatility
+- Use tight stop-losses (2-5% maximum)
+- Smaller position sizes (SMALL to MEDIUM)
+- Avoid speculative trades and high-volatility periods
+- Focus on well-established, liquid markets""",
+    'moderate': """
+- Balance growth potential with reasonable risk management
+- Accept moderate volatility for steady returns
+- Use standard stop-losses (5-10% range)
+- Medium position sizes typically appropriate
+- Mix of conservative and growth-oriented strategies
+- Consider both technical and fundamental factors equally""",
+    'aggressive': """
+- Prioritize growth potential over safety
+- Accept higher volatility for potentially higher returns
+- Use wider stop-losses (10-15% range) to avoid premature exits
+- Larger position sizes acceptable (MEDIUM to LARGE)
+- Willing to take contrarian positions
+- Focus on momentum and growth opportunities""",
+    'very_aggressive': """
+- Maximum growth potential is the primary goal
+- Accept very high volatility and significant drawdown risk
+- Use wide stop-losses (15-20%+ range) or no stops for long-term positions
+- Large position sizes acceptable
+- Comfortable with speculative trades and emerging opportunities
+- May ignore short-term market noise for long-term gains"""
+})
+
+# Shared read-only default for missing nested analysis sections
+_EMPTY = types.MappingProxyType({})
+
+# Sentiment breakdown entries embedded in a prompt; the breakdown is meant to be label counts,
+# anything larger only adds input tokens
+_MAX_BREAKDOWN_ITEMS = 8
+
+def _compact_sentiment_breakdown(breakdown) -> Dict:
+    """Keep at most _MAX_BREAKDOWN_ITEMS numeric label counts from a sentiment breakdown"""
+    if not isinstance(breakdown, dict):
+        return {}
+    counts = ((label, count) for label, count in breakdown.items() if isinstance(count, (int, float)))
+    return dict(itertools.islice(counts, _MAX_BREAKDOWN_ITEMS))
+
+# Optional ```json ... ``` fence around a model response
+_JSON_FENCE_RE = re.compile(r'^\s*(?:```(?i:json)?)?\s*(.*?)\s*(?:```)?\s*$', re.DOTALL)
+
+_REQUIRED_DECISION_FIELDS = ('decision', 'confidence', 'reasoning')
+_VALID_DECISIONS = frozenset(('BUY', 'SELL', 'HOLD'))
+
+
+def _strip_code_fence(response_text: str) -> str:
+    """Remove a surrounding markdown code fence from a model response"""
+    return _JSON_FENCE_RE.match(response_text).group(1)
+
+_JSON_START_RE = re.compile(r'[{\[]')
+_RAW_JSON_DECODER = json.JSONDecoder()
+
+def _loads_model_json(response_text: str):
+    """
+    Decode the JSON value in a model response
+    
+    Decodes with orjson, and only if that fails falls back to reading the first JSON value in the text,
+    so prose before or after it doesn't discard an otherwise valid answer.
+    
+    Raises:
+        orjson.JSONDecodeError: If the text contains no decodable JSON value
+    """
+    try:
+        return orjson.loads(response_text)
+    except orjson.JSONDecodeError:
+        match = _JSON_START_RE.search(response_text)
+        if match is not None:
+            try:
+                return _RAW_JSON_DECODER.raw_decode(response_text, match.start())[0]
+            except json.JSONDecodeError:
+                pass
+        raise
+
+
+def _enum(*values: str) -> Dict:
+    """Build a string enum schema for Gemini's JSON response mode"""
+    return {"type": "string", "format": "enum", "enum": list(values)}
+
+# Server-side JSON contract for trading decisions, mirroring the schema described in the prompt
+_DECISION_PROPERTIES = {
+    "decision": _enum("BUY", "SELL", "HOLD"),
+    "confidence": {"type": "number"},
+    "target_price": {"type": "number", "nullable": True},
+    "stop_loss": {"type": "number", "nullable": True},
+    "position_size": _enum("SMALL", "MEDIUM", "LARGE"),
+    "time_horizon": _enum("SHORT", "MEDIUM", "LONG"),
+    "risk_level": _enum("LOW", "MEDIUM", "HIGH"),
+    "timeframe_analysis": {
+        "type": "object",
+        "properties": {
+            "timeframe_category": _enum("SHORT", "MEDIUM", "LONG"),
+            "timeframe_optimization": {"type": "string"},
+            "expected_holding_period": {"type": "string"},
+            "timeframe_risks": {"type": "string"},
+            "exit_strategy": {"type": "string"}
+        }
+    },
+    "key_factors": {"type": "array", "items": {"type": "string"}},
+    "reasoning": {"type": "string"},
+    "risks": {"type": "string"},
+    "market_outlook": {"type": "string"},
+    "portfolio_adjustments": {
+        "type": "object",
+        "properties": {
+            "current_position_action": _enum("INCREASE", "DECREASE", "MAINTAIN", "CLOSE", "N/A"),
+            "recommended_position_size": {"type": "string"},
+            "position_change_rationale": {"type": "string"},
+            "rebalancing_impact": {"type": "string"},
+            "risk_impact": {"type": "string"},
+            "sell_recommendations": {"type": "string"},
+            "total_portfolio_value": {"type": "string"},
+            "diversification_score": {"type": "string"},
+            "asset_exposure": {"type": "string"}
+        }
+    },
+    "email_subject": {"type": "string"},
+    "email_body": {"type": "string"}
+}
+
+_DECISION_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": _DECISION_PROPERTIES,
+    "required": list(_REQUIRED_DECISION_FIELDS)
+}
+
+_STRING_LIST_SCHEMA = {"type": "array", "items": {"type": "string"}}
+
+# Server-side JSON contract for market summaries, mirroring _MARKET_SUMMARY_INSTRUCTIONS
+_SUMMARY_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "overall_market_sentiment": _enum("BULLISH", "BEARISH", "NEUTRAL"),
+        "market_confidence": {"type": "number"},
+        "key_themes": _STRING_LIST_SCHEMA,
+        "sector_outlook": {
+            "type": "object",
+            "properties": {
+                "energy": {"type": "string"},
+                "metals": {"type": "string"},
+                "agriculture": {"type": "string"}
+            }
+        },
+        "top_opportunities": _STRING_LIST_SCHEMA,
+        "top_risks": _STRING_LIST_SCHEMA,
+        "diversification_advice": {"type": "string"},
+        "market_summary": {"type": "string"},
+        "recommended_actions": _STRING_LIST_SCHEMA
+    },
+    "required": ["overall_market_sentiment", "market_confidence", "market_summary"]
+}
+
+# Values used for market summary fields the model left out or returned with the wrong type
+_SUMMARY_DEFAULTS = {
+    'overall_market_sentiment': 'NEUTRAL',
+    'market_confidence': 0.5,
+    'key_themes': [],
+    'sector_outlook': {
+        'energy': 'Neutral outlook',
+        'metals': 'Neutral outlook',
+        'agriculture': 'Neutral outlook'
+    },
+    'top_opportunities': [],
+    'top_risks': [],
+    'diversification_advice': 'Maintain diversified portfolio',
+    'market_summary': 'Market analysis completed',
+    'recommended_actions': []
+}
+_SUMMARY_FIELD_TYPES = {
+    key: (int, float) if isinstance(default_value, float) else type(default_value)
+    for key, default_value in _SUMMARY_DEFAULTS.items()
+}
+
+
+class _JsonEndScanner:
+    """Track bracket depth across streamed chunks to spot where the top-level JSON value closes"""
+    
+    def __init__(self):
+        self.depth = 0
+        self.started = False
+        self.in_string = False
+        self.escaped = False
+    
+    def feed(self, text: str) -> bool:
+        """Scan the next chunk; returns True once the top-level object or array is complete"""
+        for char in text:
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in '{[':
+                self.depth += 1
+                self.started = True
+            elif char in '}]' and self.started:
+                self.depth -= 1
+                if self.depth == 0:
+                    return True
+        return False
+
+
+_NO_PORTFOLIO_SECTION = """
+PORTFOLIO CONTEXT: No portfolio information available
+- Treating as new investor with no existing positions
+- Recommendations should consider starting a new position
+"""
+
+_POSITION_AND_SELL_GUIDANCE = """- Recommended position sizes: 5-10% for conservative, 10-15% for moderate, 15-25% for aggressive
+- If user has existing position: Provide specific INCREASE/DECREASE/MAINTAIN/CLOSE recommendation
+- If user has no position: Recommend appropriate portfolio percentage allocation
+- Consider impact on overall portfolio risk and diversification
+- Factor in user's risk tolerance when recommending position sizes
+
+SELL RECOMMENDATIONS GUIDANCE:
+- ALWAYS suggest which existing positions to sell to fund new trades
+- Consider selling underperforming positions to fund better opportunities
+- Recommend selling overexposed positions to improve diversification
+- Include specific asset names and quantities in sell recommendations
+- Explain rationale for sell recommendations in portfolio context
+- Consider selling positions that conflict with new trade thesis
+"""
+
+_GEMINI_MODEL_NAME = "gemini-1.5-flash"
+
+# Shared by every Gemini model the advisor creates; treat as read-only
+_GENERATION_CONFIG = {
+    "temperature": 0.3,  # Lower temperature for more consistent financial advice
+    "top_p": 0.8,
+    "top_k": 40,
+    "max_output_tokens": 2048,
+}
+
+_SAFETY_SETTINGS = [
+    {"category": category, "threshold": "BLOCK_MEDIUM_AND_ABOVE"}
+    for category in (
+        "HARM_CATEGORY_HARASSMENT",
+        "HARM_CATEGORY_HATE_SPEECH",
+        "HARM_CATEGORY_SEXUALLY_EXPLICIT",
+        "HARM_CATEGORY_DANGEROUS_CONTENT",
+    )
+]
+
+_SEARCH_TERMS_INSTRUCTIONS = """
+You are an expert financial analyst. For every asset described in the request, generate the most effective search terms for finding recent news articles about it that would impact trading decisions. Draw on the market context given with each asset.
+
+Generate search terms that will find:
+1. Price movement news and analysis
+2. Company/supply fundamentals (earnings, production, demand)
+3. Economic indicators affecting this asset
+4. Geopolitical events impacting the market
+5. Industry-specific developments and disruptions
+6. Technical analysis and trading signals
+7. Analyst upgrades/downgrades (for stocks)
+8. Regulatory news and policy changes
+
+GUIDELINES:
+- Use specific terminology that financial news sites would use
+- Include both the asset name and related market/sector terms
+- Consider earnings seasons, economic cycles, and market events
+- Mix broad and specific terms for comprehensive coverage
+- Include terms that traders and analysts would search for
+- For stocks: Include company name, ticker symbol, sector terms
+- For commodities: Include supply/demand factors, seasonal patterns
+- For Indian stocks: Include NSE, BSE, Sensex, Nifty, Indian market terms
+- For Indian markets: Include terms like "Indian stock market", "Mumbai stock exchange", "Indian equity"
+
+Return exactly 8-12 highly relevant search terms per asset, as a JSON object mapping each ASSET KEY exactly as given to its array of terms.
+Focus on terms that would appear in headlines and articles about market-moving events.
+
+Example format: {"gold": ["term1", "term2", "term3", ...], "apple": ["term1", "term2", ...]}
+
+Respond with ONLY the JSON object, no additional text.
+"""
+
+_MARKET_SUMMARY_INSTRUCTIONS = """
+You are a senior commodity market analyst providing a comprehensive market overview. Each request lists the individual commodity analyses to summarize.
+
+TASK: Provide a comprehensive market summary in the following JSON format:
+
+{
+    "overall_market_sentiment": "BULLISH" | "BEARISH" | "NEUTRAL",
+    "market_confidence": 0.0-1.0,
+    "key_themes": ["list", "of", "market", "themes"],
+    "sector_outlook": {
+        "energy": "outlook for energy commodities",
+        "metals": "outlook for metal commodities", 
+        "agriculture": "outlook for agricultural commodities"
+    },
+    "top_opportunities": ["commodity1", "commodity2", "commodity3"],
+    "top_risks": ["risk1", "risk2", "risk3"],
+    "diversification_advice": "portfolio diversification recommendations",
+    "market_summary": "comprehensive market overview and outlook",
+    "recommended_actions": ["action1", "action2", "action3"]
+}
+
+Provide strategic insights based on the individual commodity analyses.
+Respond with ONLY the JSON object, no additional text.
+Take into account general market trends and macroeconomic factors for the commodity.
+"""
+
+# Fixed portfolio analysis instructions, sent once as the portfolio model's system instruction
+_PORTFOLIO_ANALYSIS_INSTRUCTIONS = """
+You are a professional financial advisor analyzing a complete investment portfolio. Each request gives the portfolio overview and a detailed breakdown of every holding. Provide a comprehensive analysis in JSON format.
+
+ANALYSIS REQUIREMENTS:
+Provide a comprehensive portfolio analysis in the following JSON format:
+
+{
+    "overall_assessment": {
+        "portfolio_health": "EXCELLENT|GOOD|FAIR|POOR",
+        "risk_level": "LOW|MEDIUM|HIGH",
+        "diversification_score": "0-100",
+        "performance_rating": "A|B|C|D|F"
+    },
+    "key_metrics": {
+        "total_return_percentage": "calculated percentage",
+        "best_performer": "asset_symbol with best performance",
+        "worst_performer": "asset_symbol with worst performance",
+        "most_volatile": "asset_symbol with highest volatility",
+        "least_volatile": "asset_symbol with lowest volatility"
+    },
+    "sector_analysis": {
+        "sector_allocation": "breakdown by sector/asset type",
+        "concentration_risk": "assessment of concentration",
+        "diversification_recommendations": "specific recommendations"
+    },
+    "individual_holdings_analysis": {
+        "strong_holds": ["list of assets to maintain or increase"],
+        "weak_holds": ["list of assets to reduce or sell"],
+        "new_opportunities": ["suggested new positions"],
+        "position_sizing_recommendations": "specific recommendations for each holding"
+    },
+    "risk_assessment": {
+        "market_risk": "assessment of overall market exposure",
+        "concentration_risk": "risk from over-concentration",
+        "volatility_risk": "portfolio volatility assessment",
+        "liquidity_risk": "liquidity concerns"
+    },
+    "recommendations": {
+        "immediate_actions": ["specific actions to take now"],
+        "rebalancing_suggestions": ["how to rebalance the portfolio"],
+        "new_investments": ["suggested new positions"],
+        "exit_strategies": ["positions to consider selling"]
+    },
+    "market_outlook": {
+        "overall_sentiment": "BULLISH|BEARISH|NEUTRAL",
+        "key_drivers": ["main factors affecting portfolio"],
+        "sector_rotation_opportunities": ["sectors to rotate into/out of"],
+        "economic_indicators_impact": "how economic factors affect this portfolio"
+    },
+    "executive_summary": "2-3 sentence summary of portfolio status and key recommendations"
+}
+
+GUIDELINES:
+1. Be specific and actionable in all recommendations
+2. Consider the current market sentiment and economic conditions
+3. Focus on risk-adjusted returns and diversification
+4. Provide clear rationale for all recommendations
+5. Consider tax implications of any suggested changes
+6. Balance growth opportunities with risk management
+7. Consider the investor's time horizon and risk tolerance
+8. Provide specific percentage allocations where relevant
+9. Consider correlation between holdings
+10. Factor in transaction costs for rebalancing suggestions
+11. Be extremely objective, do not be biased towards any particular asset or any action
+"""
+
+# Sentiment and trend scores at or beyond which (mirrored for SELL) a decision skips Gemini
+_FAST_PATH_STRONG_SCORE = 90
+
+_FAST_PATH_DECISIONS = {
+    'BUY': {
+        'decision': 'BUY',
+        'confidence': 0.8,
+        'target_price': None,
+        'stop_loss': None,
+        'risk_level': 'MEDIUM',
+        'reasoning': 'Sentiment and price trend are both strongly bullish and RSI is not yet overbought.',
+        'risks': 'Strong consensus can reverse quickly; review position size against your portfolio',
+        'market_outlook': 'Strongly bullish',
+        'email_body': 'Sentiment and trend signals are strongly bullish. Please review the attached analysis.'
+    },
+    'SELL': {
+        'decision': 'SELL',
+        'confidence': 0.8,
+        'target_price': None,
+        'stop_loss': None,
+        'risk_level': 'MEDIUM',
+        'reasoning': 'Sentiment and price trend are both strongly bearish and RSI is not yet oversold.',
+        'risks': 'Strong consensus can reverse quickly; review position size against your portfolio',
+        'market_outlook': 'Strongly bearish',
+        'email_body': 'Sentiment and trend signals are strongly bearish. Please review the attached analysis.'
+    }
+}
+
+# Fast-path position size by risk tolerance (unknown levels are treated as moderate)
+_FAST_PATH_POSITION_SIZES = {
+    'conservative': 'SMALL',
+    'moderate': 'MEDIUM',
+    'aggressive': 'LARGE',
+    'very_aggressive': 'LARGE'
+}
+
+# Fast-path decisions are only made without a portfolio, so there is no position to adjust
+_FAST_PATH_PORTFOLIO_ADJUSTMENTS = {
+    'current_position_action': 'N/A',
+    'recommended_position_size': 'N/A',
+    'position_change_rationale': 'No portfolio context was provided for this decision',
+    'rebalancing_impact': 'N/A',
+    'risk_impact': 'N/A'
+}
+
+def _timeframe_category(timeframe_days: int) -> str:
+    """Map an analysis timeframe to the SHORT/MEDIUM/LONG categories used in decisions"""
+    if timeframe_days <= 7:
+        return 'SHORT'
+    elif timeframe_days <= 30:
+        return 'MEDIUM'
+    return 'LONG'
+
+# One concurrency limiter per event loop (the web app and scheduler create their own loops)
+_gemini_semaphores = weakref.WeakKeyDictionary()
+
+def _get_gemini_semaphore() -> asyncio.Semaphore:
+    """Get the Gemini request limiter for the running event loop"""
+    loop = asyncio.get_running_loop()
+    semaphore = _gemini_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(Config.GEMINI_MAX_CONCURRENCY)
+        _gemini_semaphores[loop] = semaphore
+    return semaphore
+
+# Process-wide requests-per-minute budget, so bursts wait here instead of in the SDK's 429 backoff
+_gemini_rate_limiter = RateLimiter(max_requests=Config.GEMINI_QPM, time_window=60)
+
+# Gemini errors worth retrying with backoff; anything else (bad request, auth, blocked prompt) fails at once
+_GEMINI_TRANSIENT_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.InternalServerError,
+)
+
+# Gemini errors that will fail every other request too (bad key, no access, quota spent after retries),
+# flagged on error decisions so a batch can stop early
+_GEMINI_FATAL_ERRORS = (
+    google_exceptions.Unauthenticated,
+    google_exceptions.PermissionDenied,
+    google_exceptions.ResourceExhausted,
+)
+
+# Stops sending requests during a Gemini outage (consecutive transient errors) instead of
+# tying up every caller in retries
+_gemini_circuit_breaker = CircuitBreaker(failure_threshold=10, reset_timeout=30)
+
+def _check_gemini_circuit():
+    """Raise instead of calling Gemini while the circuit breaker is open"""
+    if not _gemini_circuit_breaker.allow_request():
+        raise AIAnalysisError("Gemini is unavailable after repeated failures, try again shortly")
+
+# Worker threads for the Gemini calls that still go through the synchronous SDK,
+# shared by every event loop so the total number of blocking calls stays bounded
+_gemini_executor = ThreadPoolExecutor(max_workers=Config.GEMINI_MAX_CONCURRENCY, thread_name_prefix='gemini')
+
+async def _run_blocking(func, *args, **kwargs):
+    """Run a blocking call on the default executor (asyncio.to_thread needs Python 3.9)"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, partial(func, *args, **kwargs))
+
+def _call_in_app_context(app, func, *args, **kwargs):
+    """Call func in a new app context of its own, so the worker thread gets a fresh database session"""
+    if app is None:
+        return func(*args, **kwargs)
+    
+    with app.app_context():
+        try:
+            return func(*args, **kwargs)
+        finally:
+            db.session.remove()
+
+async def _run_db_call(func, *args, **kwargs):
+    """Run a blocking database call on a worker thread, off the caller's app context and session"""
+    app = current_app._get_current_object() if has_app_context() else None
+    return await _run_blocking(_call_in_app_context, app, func, *args, **kwargs)
+
+# Portfolio context without the per-asset exposure, keyed by (user_email, portfolio_id, include_holdings)
+_portfolio_base_cache = TTLCache(maxsize=1024, ttl=60)
+_portfolio_base_lock = threading.Lock()
+
+# Striped locks so concurrent analyses for one user (e.g. a multi-asset run) share a single load;
+# a fixed pool keeps memory bounded however many users a long-running process sees
+_PORTFOLIO_LOAD_LOCK_STRIPES = 64
+_portfolio_load_locks = tuple(threading.Lock() for _ in range(_PORTFOLIO_LOAD_LOCK_STRIPES))
+
+def invalidate_portfolio_context(user_email: str):
+    """Drop cached portfolio context for a user after their portfolios change"""
+    with _portfolio_base_lock:
+        for key in [key for key in _portfolio_base_cache if key[0] == user_email]:
+            _portfolio_base_cache.pop(key, None)
+
+# Parsed trading decisions keyed by a hash of the full analysis prompt, so re-running
+# an analysis on unchanged inputs skips the Gemini round trip
+_decision_cache = TTLCache(maxsize=4096, ttl=300)
+_decision_cache_lock = threading.Lock()
+
+def _prompt_cache_key(prompt: str) -> str:
+    """Get a compact, stable cache key for a prompt"""
+    return hashlib.blake2b(prompt.encode('utf-8'), digest_size=16).hexdigest()
+
+def _near_decision_cache_key(commodity: str, sentiment_analysis: Dict, data_analysis: Dict, timeframe_days: int,
+                             risk_tolerance: str, portfolio_context: Optional[Dict]) -> Optional[str]:
+    """
+    Get a decision cache key that ignores small sentiment and trend score moves
+    
+    Calls for the same asset, price, timeframe, risk tolerance and portfolio whose scores fall in the
+    same Config.DECISION_CACHE_SCORE_BUCKET-point bucket share a key. Returns None when bucketing
+    is disabled or the scores are missing.
+    """
+    bucket = Config.DECISION_CACHE_SCORE_BUCKET
+    sentiment_score = sentiment_analysis.get('normalized_score')
+    trend_score = data_analysis.get('trend_score')
+    if bucket <= 0 or not isinstance(sentiment_score, (int, float)) or not isinstance(trend_score, (int, float)):
+        return None
+    
+    fingerprint = (
+        commodity, timeframe_days, risk_tolerance,
+        round(sentiment_score / bucket), round(trend_score / bucket),
+        data_analysis.get('current_price'), portfolio_context
+    )
+    payload = orjson.dumps(fingerprint, default=str, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+# Parsed portfolio analyses keyed by a hash of the full prompt; the prompt embeds every holding's
+# position, price and sentiment, so a hit means nothing Gemini would look at has changed
+_portfolio_analysis_cache = TTLCache(maxsize=256, ttl=600)
+_portfolio_analysis_cache_lock = threading.Lock()
+
+def _portfolio_fingerprint(all_holdings: List[Dict], holdings_data: Dict, sentiment_data: Dict,
+                           timeframe_days: int) -> str:
+    """
+    Get a key for a portfolio analysis that only changes when the portfolio's state does
+    
+    Covers each holding's position, its price rounded to cents and its sentiment label, so
+    sub-cent price moves and sentiment score jitter reuse the previous analysis.
+    """
+    state = [
+        (
+            holding['asset_symbol'], holding.get('quantity'), holding.get('avg_cost'),
+            round(holdings_data.get(holding['asset_symbol'], {}).get('current_price', 0), 2),
+            sentiment_data.get(holding['asset_symbol'], {}).get('sentiment_label', '')
+        )
+        for holding in all_holdings
+    ]
+    payload = orjson.dumps([timeframe_days, state], default=str)
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+# Gemini-generated search terms keyed by (asset, timeframe_days); the terms only steer news
+# scraping, so an hour-old answer is as good as a fresh one
+_search_terms_cache = TTLCache(maxsize=512, ttl=3600)
+_search_terms_cache_lock = threading.Lock()
+
+# Ticker symbols (e.g. 'aapl', 'gc=f') mapped back to their asset keys, so a request for an asset
+# by ticker shares its cached search terms with the request by name
+_ASSET_BY_SYMBOL = {symbol.lower(): asset for asset, symbol in Config.ALL_SYMBOLS.items()}
+
+def _search_terms_cache_key(asset: str, timeframe_days: int) -> Tuple[str, int]:
+    """Get the search terms cache key, treating spellings and tickers of one asset as the same request"""
+    asset_key = asset.strip().lower()
+    asset_key = _ASSET_BY_SYMBOL.get(asset_key, asset_key).replace(' ', '_').replace('-', '_')
+    return asset_key, timeframe_days
+
+# Search terms and market summaries barely change within a day, so they are also kept on disk
+# and reused across runs and processes
+_gemini_disk_cache = PersistentCache(Config.GEMINI_CACHE_PATH, Config.GEMINI_CACHE_TTL) if Config.GEMINI_CACHE_PATH else None
+
+def _disk_cache_get(key: str):
+    """Read a Gemini result from the on-disk cache, if enabled"""
+    return _gemini_disk_cache.get(key) if _gemini_disk_cache is not None else None
+
+def _disk_cache_set(key: str, value):
+    """Store a Gemini result in the on-disk cache, if enabled"""
+    if _gemini_disk_cache is not None:
+        _gemini_disk_cache.set(key, value)
+
+def _search_terms_disk_key(asset: str, timeframe_days: int) -> str:
+    """Get the on-disk cache key for an asset's search terms"""
+    asset_key, timeframe_days = _search_terms_cache_key(asset, timeframe_days)
+    return f"search_terms:{asset_key}:{timeframe_days}"
+
+# Hand-picked fallback search terms for the core commodities (read-only, shared by every call)
+_ENHANCED_FALLBACK_TERMS: Mapping[str, Tuple[str, ...]] = types.MappingProxyType({
+    'gold': (
+        'gold price forecast', 'gold market analysis', 'gold futures trading',
+        'precious metals outlook', 'gold inflation hedge', 'central bank gold reserves',
+        'gold mining stocks', 'gold ETF flows', 'dollar gold correlation'
+    ),
+    'silver': (
+        'silver price prediction', 'silver industrial demand', 'silver mining supply',
+        'silver gold ratio', 'precious metals rally', 'silver investment demand',
+        'silver market fundamentals', 'silver futures analysis'
+    ),
+    'crude_oil': (
+        'oil price forecast', 'crude oil inventory', 'OPEC production cuts',
+        'oil demand outlook', 'refinery capacity', 'oil geopolitics',
+        'WTI crude analysis', 'energy market trends', 'oil supply disruption'
+    ),
+    'natural_gas': (
+        'natural gas price forecast', 'gas storage levels', 'LNG exports',
+        'gas demand winter', 'pipeline capacity', 'gas production growth',
+        'energy transition gas', 'gas market fundamentals'
+    ),
+    'copper': (
+        'copper price outlook', 'copper demand china', 'copper mine supply',
+        'industrial metals forecast', 'copper construction demand', 'EV copper demand',
+        'copper inventory levels', 'base metals analysis'
+    ),
+    'wheat': (
+        'wheat price forecast', 'wheat crop conditions', 'grain export restrictions',
+        'wheat supply outlook', 'agricultural commodities', 'food inflation wheat',
+        'wheat harvest estimates', 'grain market analysis'
+    ),
+    'corn': (
+        'corn price prediction', 'corn crop yield', 'ethanol demand corn',
+        'grain export demand', 'corn planting progress', 'feed demand corn',
+        'agricultural weather corn', 'corn futures analysis'
+    ),
+    'soybeans': (
+        'soybean price outlook', 'soy crop conditions', 'china soybean imports',
+        'soybean crush margins', 'agricultural trade war', 'soy meal demand',
+        'brazil soybean harvest', 'oilseed market trends'
+    )
+})
+
+# Generic fallback search terms for other assets, appended to the asset name
+_GENERIC_FALLBACK_TERM_SUFFIXES = (
+    'price analysis', 'market outlook', 'supply demand', 'futures trading', 'investment forecast'
+)
+
+# Asset lookups for search term generation; Config symbol tables are fixed for the process lifetime
+_COMMODITY_ASSETS = frozenset(Config.COMMODITY_SYMBOLS)
+_STOCK_ASSETS = frozenset(Config.STOCK_SYMBOLS)
+_INDIAN_STOCK_MARKERS = ('tata', 'reliance', 'infosys', 'tcs', 'hdfc', 'icici', 'sbi', 'bharti',
+                         'adani', 'wipro', 'hcl', 'maruti', 'bajaj', 'mahindra', 'itc', 'hindalco')
+
+def _is_indian_stock(asset_key: str) -> bool:
+    """Check whether a lowercased stock key names an Indian company"""
+    return any(marker in asset_key for marker in _INDIAN_STOCK_MARKERS)
+
+@lru_cache(maxsize=256)
+def _fallback_search_terms(asset: str) -> Tuple[str, ...]:
+    """Generate enhanced fallback search terms for an asset (cached, so returned as a tuple)"""
+    base_terms = [asset, asset.replace('_', ' ')]
+    asset_key = asset.lower()
+    
+    # Determine asset type for better fallback terms
+    if asset_key in _STOCK_ASSETS:
+        # Stock-specific fallback terms
+        symbol = Config.STOCK_SYMBOLS[asset_key]
+        base_terms.extend([
+            f'{asset} stock analysis', f'{asset} earnings', f'{asset} price target',
+            f'{asset} analyst rating', f'{symbol} stock', f'{asset} quarterly results',
+            f'{asset} revenue growth', f'{asset} stock forecast', f'{asset} market cap',
+            f'{asset} investment outlook'
+        ])
+        
+        # Add Indian market-specific terms for Indian stocks
+        if _is_indian_stock(asset_key):
+            base_terms.extend([
+                f'{asset} NSE BSE', f'{asset} Indian stock market', f'{asset} Sensex Nifty',
+                f'{asset} Indian equity', f'{asset} Mumbai stock exchange', f'{asset} Indian shares',
+                f'{asset} Indian market analysis', f'{asset} Indian stock news'
+            ])
+    else:
+        # Commodity fallback terms (existing logic)
+        pass
+    
+    # Enhanced commodity-specific terms
+    if asset in _ENHANCED_FALLBACK_TERMS:
+        base_terms.extend(_ENHANCED_FALLBACK_TERMS[asset])
+    else:
+        # Generic asset terms
+        base_terms.extend(f'{asset} {suffix}' for suffix in _GENERIC_FALLBACK_TERM_SUFFIXES)
+    
+    return tuple(base_terms)
+
 class GeminiCommodityAdvisor:
     """
     Uses Gemini AI to make commodity trading decisions based on NLP sentiment and data analysis
     """
     
+    _instance: Optional['GeminiCommodityAdvisor'] = None
+    _instance_lock = threading.Lock()
+    
     def __init__(self):
         self.config = Config()
-        self.auth_service = AuthService()
+        self._portfolio_nlp_analyzer = None
+        self._portfolio_nlp_analyzer_lock = threading.Lock()
         self._initialize_gemini()
+    
+    @classmethod
+    def get_instance(cls) -> 'GeminiCommodityAdvisor':
+        """Get the process-wide advisor, configuring the Gemini client only on first use"""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
         
     def _initialize_gemini(self):
         """Initialize Gemini AI"""
@@ -32,34 +758,111 @@ class GeminiCommodityAdvisor:
             
             genai.configure(api_key=self.config.GEMINI_API_KEY)
             
-            # Configure the model
-            generation_config = {
-                "temperature": 0.3,  # Lower temperature for more consistent financial advice
-                "top_p": 0.8,
-                "top_k": 40,
-                "max_output_tokens": 2048,
-            }
-            
-            safety_settings = [
-                {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-                {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-                {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-                {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-            ]
-            
             self.model = genai.GenerativeModel(
-                model_name="gemini-1.5-flash",
-                generation_config=generation_config,
-                safety_settings=safety_settings
+                model_name=_GEMINI_MODEL_NAME,
+                generation_config=_GENERATION_CONFIG,
+                safety_settings=_SAFETY_SETTINGS
+            )
+            
+            # The fixed instructions for search terms and market summaries are attached to
+            # dedicated models once, so each request only carries its per-call data. Both
+            # answer in JSON mode; search terms are keyed by the requested assets, so only
+            # the MIME type can be enforced for them
+            self.search_terms_model = genai.GenerativeModel(
+                model_name=_GEMINI_MODEL_NAME,
+                generation_config={**_GENERATION_CONFIG, "response_mime_type": "application/json"},
+                safety_settings=_SAFETY_SETTINGS,
+                system_instruction=_SEARCH_TERMS_INSTRUCTIONS
+            )
+            self.summary_model = genai.GenerativeModel(
+                model_name=_GEMINI_MODEL_NAME,
+                generation_config={
+                    **_GENERATION_CONFIG,
+                    "response_mime_type": "application/json",
+                    "response_schema": _SUMMARY_RESPONSE_SCHEMA
+                },
+                safety_settings=_SAFETY_SETTINGS,
+                system_instruction=_MARKET_SUMMARY_INSTRUCTIONS
+            )
+            self.portfolio_model = genai.GenerativeModel(
+                model_name=_GEMINI_MODEL_NAME,
+                generation_config=_GENERATION_CONFIG,
+                safety_settings=_SAFETY_SETTINGS,
+                system_instruction=_PORTFOLIO_ANALYSIS_INSTRUCTIONS
             )
             
             logger.info("Gemini AI initialized successfully")
             
         except Exception as e:
-            logger.error(f"Error initializing Gemini AI: {e}")
+            logger.error("Error initializing Gemini AI: %s", e)
             raise
     
-    def get_portfolio_context(self, user_email: str, asset_symbol: str = None, portfolio_id: int = None) -> Dict:
+    @retry_on_failure(max_attempts=4, delay=0.5, backoff_factor=2.0, exceptions=_GEMINI_TRANSIENT_ERRORS, jitter=True)
+    async def _generate_json_async(self, prompt: str, response_schema: Optional[Dict] = None, model=None) -> str:
+        """
+        Stream a JSON response from Gemini and stop reading once the top-level value is closed
+        
+        Args:
+            prompt: Prompt to send
+            response_schema: Schema to enforce for this call; omit when the model is
+                already configured for JSON output
+            model: Model to use, defaults to the trading decision model
+        """
+        model = model or self.model
+        generation_config = None
+        if response_schema is not None:
+            generation_config = {
+                "response_mime_type": "application/json",
+                "response_schema": response_schema
+            }
+        scanner = _JsonEndScanner()
+        chunks = []
+        _check_gemini_circuit()
+        async with _get_gemini_semaphore():
+            await _gemini_rate_limiter.acquire()
+            try:
+                response = await model.generate_content_async(
+                    prompt, generation_config=generation_config, stream=True
+                )
+                async for chunk in response:
+                    text = chunk.text
+                    chunks.append(text)
+                    if scanner.feed(text):
+                        break
+            except _GEMINI_TRANSIENT_ERRORS:
+                _gemini_circuit_breaker.record_failure()
+                raise
+            except Exception:
+                # Gemini answered (bad request, auth, blocked prompt), so it is reachable
+                _gemini_circuit_breaker.record_success()
+                raise
+            else:
+                _gemini_circuit_breaker.record_success()
+        return "".join(chunks)
+    
+    @retry_on_failure(max_attempts=4, delay=0.5, backoff_factor=2.0, exceptions=_GEMINI_TRANSIENT_ERRORS, jitter=True)
+    async def generate_content_in_pool(self, prompt: str, model=None):
+        """Call the synchronous Gemini SDK on the shared worker pool instead of the event loop thread"""
+        model = model or self.model
+        loop = asyncio.get_running_loop()
+        _check_gemini_circuit()
+        async with _get_gemini_semaphore():
+            await _gemini_rate_limiter.acquire()
+            try:
+                response = await loop.run_in_executor(_gemini_executor, model.generate_content, prompt)
+            except _GEMINI_TRANSIENT_ERRORS:
+                _gemini_circuit_breaker.record_failure()
+                raise
+            except Exception:
+                # Gemini answered (bad request, auth, blocked prompt), so it is reachable
+                _gemini_circuit_breaker.record_success()
+                raise
+            else:
+                _gemini_circuit_breaker.record_success()
+        return response
+    
+    def get_portfolio_context(self, user_email: str, asset_symbol: str = None, portfolio_id: int = None,
+                              include_holdings: bool = True) -> Dict:
         """
         Get portfolio context for a user, optionally filtered by asset or portfolio
         
@@ -67,31 +870,48 @@ class GeminiCommodityAdvisor:
             user_email: User's email address
             asset_symbol: Optional asset symbol to filter by
             portfolio_id: Optional portfolio ID to filter by
+            include_holdings: Include per-holding details; when False only totals
+                and asset exposure are loaded, aggregated in the database
             
         Returns:
             Dict containing portfolio context
         """
+        cache_key = (user_email, portfolio_id, include_holdings)
+        with _portfolio_base_lock:
+            base = _portfolio_base_cache.get(cache_key)
+        
+        if base is None:
+            load_lock = _portfolio_load_locks[hash(cache_key) % _PORTFOLIO_LOAD_LOCK_STRIPES]
+            with load_lock:
+                # Another caller may have loaded it while we waited
+                with _portfolio_base_lock:
+                    base = _portfolio_base_cache.get(cache_key)
+                
+                if base is None:
+                    base = self._get_portfolio_base(user_email, portfolio_id, include_holdings)
+                    if "error" not in base:
+                        with _portfolio_base_lock:
+                            _portfolio_base_cache[cache_key] = base
+        
+        return self._attach_current_asset_exposure(base, asset_symbol)
+    
+    def _get_portfolio_base(self, user_email: str, portfolio_id: int = None,
+                            include_holdings: bool = True) -> Dict:
+        """Load portfolio context from the database (without per-asset exposure)"""
         try:
-            # Get user by email
-            user = self.auth_service.get_user_by_email(user_email)
-            if not user:
-                logger.warning(f"User not found for email: {user_email}")
-                return {"error": "User not found"}
+            if not include_holdings:
+                return self._get_portfolio_totals(user_email, portfolio_id)
             
-            # Get portfolios for the user (filter by portfolio_id if provided)
-            query = Portfolio.query.filter_by(
-                user_id=user.id, 
-                is_active=True
-            )
-            
-            if portfolio_id:
-                query = query.filter_by(id=portfolio_id)
+            # Get the user's portfolios (filter by portfolio_id if provided) joined with
+            # their active holdings, as plain rows rather than ORM instances
+            stmt = self._select_user_portfolios(
+                user_email, portfolio_id,
+                Portfolio.id, Portfolio.name, Portfolio.description,
+                Holding.asset_symbol, Holding.asset_name, Holding.quantity,
+                Holding.avg_cost_per_share, Holding.current_price
+            ).order_by(Portfolio.id, Holding.id)
             
-            portfolios = query.all()
-            
-            if not portfolios:
-                logger.info(f"No portfolios found for user: {user_email}")
-                return {"portfolios": [], "total_value": 0, "asset_exposure": {}}
+            rows = db.session.execute(stmt.execution_options(yield_per=500))
             
             portfolio_context = {
                 "portfolios": [],
@@ -100,50 +920,66 @@ class GeminiCommodityAdvisor:
                 "diversification_score": 0
             }
             
-            all_holdings = []
+            portfolios_by_id = {}
+            asset_exposure = portfolio_context["asset_exposure"]
+            user_found = False
             
-            for portfolio in portfolios:
-                # Get holdings for this portfolio
-                holdings = Holding.query.filter_by(
-                    portfolio_id=portfolio.id,
-                    is_active=True
-                ).all()
+            for (pid, name, description, asset_symbol, asset_name,
+                 quantity, avg_cost_per_share, current_price) in rows:
+                user_found = True
                 
-                portfolio_data = {
-                    "id": portfolio.id,
-                    "name": portfolio.name,
-                    "description": portfolio.description,
-                    "holdings": [],
-                    "total_value": 0,
-                    "total_cost": 0,
-                    "gain_loss": 0,
-                    "gain_loss_percent": 0
-                }
+                # User without matching portfolios (outer join)
+                if pid is None:
+                    continue
                 
-                for holding in holdings:
-                    holding_data = {
-                        "asset_symbol": holding.asset_symbol,
-                        "asset_name": holding.asset_name,
-                        "quantity": float(holding.quantity),
-                        "avg_cost": float(holding.avg_cost_per_share),
-                        "current_price": float(holding.current_price) if holding.current_price else None,
-                        "current_value": float(holding.current_value),
-                        "gain_loss": float(holding.gain_loss),
-                        "gain_loss_percent": float(holding.gain_loss_percent)
+                portfolio_data = portfolios_by_id.get(pid)
+                if portfolio_data is None:
+                    portfolio_data = portfolios_by_id[pid] = {
+                        "id": pid,
+                        "name": name,
+                        "description": description,
+                        "holdings": [],
+                        "total_value": 0,
+                        "total_cost": 0,
+                        "gain_loss": 0,
+                        "gain_loss_percent": 0
                     }
-                    
-                    portfolio_data["holdings"].append(holding_data)
-                    portfolio_data["total_value"] += holding_data["current_value"]
-                    portfolio_data["total_cost"] += holding_data["quantity"] * holding_data["avg_cost"]
-                    
-                    # Track asset exposure across all portfolios
-                    if holding.asset_symbol in portfolio_context["asset_exposure"]:
-                        portfolio_context["asset_exposure"][holding.asset_symbol] += holding_data["current_value"]
-                    else:
-                        portfolio_context["asset_exposure"][holding.asset_symbol] = holding_data["current_value"]
-                    
-                    all_holdings.append(holding_data)
                 
+                # Portfolio without active holdings (outer join)
+                if asset_symbol is None:
+                    continue
+                
+                # Same arithmetic as the Holding model properties
+                total_cost = float(quantity * avg_cost_per_share)
+                current_value = float(quantity * current_price) if current_price is not None else 0.0
+                gain_loss = current_value - total_cost
+                holding_data = {
+                    "asset_symbol": asset_symbol,
+                    "asset_name": asset_name,
+                    "quantity": float(quantity),
+                    "avg_cost": float(avg_cost_per_share),
+                    "current_price": float(current_price) if current_price else None,
+                    "current_value": current_value,
+                    "gain_loss": gain_loss,
+                    "gain_loss_percent": (gain_loss / total_cost) * 100 if total_cost else 0.0
+                }
+                
+                portfolio_data["holdings"].append(holding_data)
+                portfolio_data["total_value"] += current_value
+                portfolio_data["total_cost"] += holding_data["quantity"] * holding_data["avg_cost"]
+                
+                # Track asset exposure across all portfolios
+                asset_exposure[asset_symbol] = asset_exposure.get(asset_symbol, 0) + current_value
+            
+            if not user_found:
+                logger.warning("User not found for email: %s", user_email)
+                return {"error": "User not found"}
+            
+            if not portfolios_by_id:
+                logger.info("No portfolios found for user: %s", user_email)
+                return {"portfolios": [], "total_value": 0, "asset_exposure": {}}
+            
+            for portfolio_data in portfolios_by_id.values():
                 # Calculate portfolio-level metrics
                 if portfolio_data["total_cost"] > 0:
                     portfolio_data["gain_loss"] = portfolio_data["total_value"] - portfolio_data["total_cost"]
@@ -157,26 +993,127 @@ class GeminiCommodityAdvisor:
             if portfolio_context["total_value"] > 0:
                 portfolio_context["diversification_score"] = min(unique_assets * 10, 100)  # Max 100
             
-            # Check if user has exposure to the specific asset being analyzed
-            if asset_symbol:
-                asset_exposure = portfolio_context["asset_exposure"].get(asset_symbol, 0)
-                portfolio_context["current_asset_exposure"] = {
-                    "symbol": asset_symbol,
-                    "value": asset_exposure,
-                    "percentage": (asset_exposure / portfolio_context["total_value"] * 100) if portfolio_context["total_value"] > 0 else 0,
-                    "has_position": asset_exposure > 0
-                }
-            
-            logger.info(f"Retrieved portfolio context for {user_email}: {len(portfolios)} portfolios, ${portfolio_context['total_value']:.2f} total value")
+            logger.info("Retrieved portfolio context for %s: %d portfolios, $%.2f total value",
+                        user_email, len(portfolios_by_id), portfolio_context['total_value'])
             return portfolio_context
             
         except Exception as e:
-            logger.error(f"Error getting portfolio context for {user_email}: {e}")
+            logger.error("Error getting portfolio context for %s: %s", user_email, e)
             return {"error": str(e)}
     
+    @staticmethod
+    def _select_user_portfolios(user_email: str, portfolio_id: Optional[int], *columns):
+        """
+        Select columns from a user's active portfolios and their active holdings in one query
+        
+        The user row is the outer side of both joins, so a user without portfolios still
+        yields a single row with NULL portfolio columns and an unknown user yields no rows.
+        """
+        portfolio_join = and_(Portfolio.user_id == User.id, Portfolio.is_active == True)
+        if portfolio_id:
+            portfolio_join = and_(portfolio_join, Portfolio.id == portfolio_id)
+        
+        return select(*columns).select_from(User).join(
+            Portfolio, portfolio_join, isouter=True
+        ).join(
+            Holding,
+            and_(Holding.portfolio_id == Portfolio.id, Holding.is_active == True),
+            isouter=True
+        ).where(User.email == user_email)
+    
+    def _get_portfolio_totals(self, user_email: str, portfolio_id: int = None) -> Dict:
+        """Load portfolio totals and asset exposure, summed in the database per portfolio and asset"""
+        current_value = func.sum(Holding.quantity * Holding.current_price)
+        total_cost = func.sum(Holding.quantity * Holding.avg_cost_per_share)
+        
+        stmt = self._select_user_portfolios(
+            user_email, portfolio_id,
+            Portfolio.id, Portfolio.name, Portfolio.description, Holding.asset_symbol,
+            current_value.label('current_value'), total_cost.label('total_cost')
+        ).group_by(
+            Portfolio.id, Portfolio.name, Portfolio.description, Holding.asset_symbol
+        ).order_by(Portfolio.id)
+        
+        rows = db.session.execute(stmt).all()
+        
+        if not rows:
+            logger.warning("User not found for email: %s", user_email)
+            return {"error": "User not found"}
+        
+        if rows[0][0] is None:
+            logger.info("No portfolios found for user: %s", user_email)
+            return {"portfolios": [], "total_value": 0, "asset_exposure": {}}
+        
+        portfolio_context = {
+            "portfolios": [],
+            "total_value": 0,
+            "asset_exposure": {},
+            "diversification_score": 0
+        }
+        
+        portfolios_by_id = {}
+        asset_exposure = portfolio_context["asset_exposure"]
+        
+        for pid, name, description, asset_symbol, value, cost in rows:
+            portfolio_data = portfolios_by_id.get(pid)
+            if portfolio_data is None:
+                portfolio_data = portfolios_by_id[pid] = {
+                    "id": pid,
+                    "name": name,
+                    "description": description,
+                    "total_value": 0,
+                    "total_cost": 0,
+                    "gain_loss": 0,
+                    "gain_loss_percent": 0
+                }
+            
+            # Portfolio without active holdings (outer join)
+            if asset_symbol is None:
+                continue
+            
+            # SUM skips holdings without a current price, matching a value of 0
+            value = float(value or 0)
+            portfolio_data["total_value"] += value
+            portfolio_data["total_cost"] += float(cost or 0)
+            asset_exposure[asset_symbol] = asset_exposure.get(asset_symbol, 0) + value
+        
+        for portfolio_data in portfolios_by_id.values():
+            if portfolio_data["total_cost"] > 0:
+                portfolio_data["gain_loss"] = portfolio_data["total_value"] - portfolio_data["total_cost"]
+                portfolio_data["gain_loss_percent"] = (portfolio_data["gain_loss"] / portfolio_data["total_cost"]) * 100
+            
+            portfolio_context["portfolios"].append(portfolio_data)
+            portfolio_context["total_value"] += portfolio_data["total_value"]
+        
+        if portfolio_context["total_value"] > 0:
+            portfolio_context["diversification_score"] = min(len(asset_exposure) * 10, 100)  # Max 100
+        
+        logger.info("Retrieved portfolio totals for %s: %d portfolios, $%.2f total value",
+                    user_email, len(portfolios_by_id), portfolio_context['total_value'])
+        return portfolio_context
+    
+    @staticmethod
+    def _attach_current_asset_exposure(base: Dict, asset_symbol: str = None) -> Dict:
+        """Return a copy of the portfolio context with the user's exposure to asset_symbol added"""
+        # Deep copy so callers can't modify the nested portfolios/exposure held in _portfolio_base_cache
+        portfolio_context = copy.deepcopy(base)
+        if not asset_symbol or "error" in base or "diversification_score" not in base:
+            return portfolio_context
+        
+        # Check if user has exposure to the specific asset being analyzed
+        asset_exposure = portfolio_context["asset_exposure"].get(asset_symbol, 0)
+        portfolio_context["current_asset_exposure"] = {
+            "symbol": asset_symbol,
+            "value": asset_exposure,
+            "percentage": (asset_exposure / portfolio_context["total_value"] * 100) if portfolio_context["total_value"] > 0 else 0,
+            "has_position": asset_exposure > 0
+        }
+        return portfolio_context
+    
     async def make_trading_decision(self, commodity: str, sentiment_analysis: Dict, 
                                   data_analysis: Dict, timeframe_days: int, risk_tolerance: str = 'moderate',
-                                  user_email: str = None, portfolio_context: Dict = None) -> Dict:
+                                  user_email: str = None, portfolio_context: Dict = None,
+                                  fast_path: bool = False) -> Dict:
         """
         Make a trading decision based on sentiment and data analysis
         
@@ -188,97 +1125,229 @@ class GeminiCommodityAdvisor:
             risk_tolerance: User's risk tolerance level
             user_email: User's email for portfolio context (optional)
             portfolio_context: Pre-fetched portfolio context (optional)
+            fast_path: Decide without Gemini when sentiment and trend agree overwhelmingly;
+                ignored when a portfolio is involved, since the rules cannot weigh existing positions
             
         Returns:
             Dict containing trading decision and reasoning
         """
         try:
-            logger.info(f"Making trading decision for {commodity}")
-            
-            # Get portfolio context if user_email is provided and portfolio_context is not already provided
+            logger.info("Making trading decision for %s", commodity)
+            
+            if fast_path and not user_email and not portfolio_context:
+                decision_data = self._get_fast_path_decision(
+                    commodity, sentiment_analysis, data_analysis, timeframe_days, risk_tolerance
+                )
+                if decision_data is not None:
+                    logger.info("fast_path_hit for %s: %s", commodity, decision_data['decision'])
+                    return self._add_decision_metadata(
+                        decision_data, commodity, sentiment_analysis, data_analysis, timeframe_days
+                    )
+            
+            # Get portfolio context if user_email is provided and portfolio_context is not already provided.
+            # Database access is blocking, so run it on a worker thread while the market data
+            # part of the prompt is built
+            portfolio_task = None
             if user_email and not portfolio_context:
-                logger.info(f"Fetching portfolio context for user: {user_email}")
-                portfolio_context = self.get_portfolio_context(user_email, commodity)
+                logger.info("Fetching portfolio context for user: %s", user_email)
+                portfolio_task = asyncio.create_task(_run_db_call(
+                    self.get_portfolio_context, user_email, commodity, include_holdings=False
+                ))
+            elif not user_email:
+                logger.info("No user email provided - analysis will proceed without portfolio context")
+            
+            market_section = self._create_market_data_section(
+                commodity, sentiment_analysis, data_analysis, timeframe_days
+            )
+            
+            if portfolio_task is not None:
+                portfolio_context = await portfolio_task
                 if "error" in portfolio_context:
-                    logger.warning(f"Could not get portfolio context: {portfolio_context['error']}")
+                    logger.warning("Could not get portfolio context: %s", portfolio_context['error'])
                     portfolio_context = None
                 else:
-                    logger.info(f"Successfully retrieved portfolio context for {user_email}")
-            elif not user_email:
-                logger.info(f"No user email provided - analysis will proceed without portfolio context")
+                    logger.info("Successfully retrieved portfolio context for %s", user_email)
             
             # Create comprehensive prompt
             prompt = self._create_analysis_prompt(
-                commodity, sentiment_analysis, data_analysis, timeframe_days, risk_tolerance, portfolio_context
+                commodity, sentiment_analysis, data_analysis, timeframe_days, risk_tolerance, portfolio_context,
+                market_section=market_section
             )
             
-            # Get Gemini's analysis
-            response = self.model.generate_content(prompt)
-            
-            if not response.text:
-                raise ValueError("Empty response from Gemini AI")
-            
-            # Parse the response
-            decision_data = self._parse_gemini_response(response.text, commodity)
+            # Identical inputs produce an identical prompt, reuse a recent decision for it, or failing
+            # that one made for the same market snapshot with nearly the same scores
+            cache_key = _prompt_cache_key(prompt)
+            near_cache_key = _near_decision_cache_key(
+                commodity, sentiment_analysis, data_analysis, timeframe_days, risk_tolerance, portfolio_context
+            )
+            with _decision_cache_lock:
+                cached_decision = _decision_cache.get(cache_key)
+                if cached_decision is None and near_cache_key is not None:
+                    cached_decision = _decision_cache.get(near_cache_key)
+            
+            if cached_decision is not None:
+                logger.info("Using cached trading decision for %s", commodity)
+                # Deep copy: callers and _add_decision_metadata modify nested fields
+                decision_data = copy.deepcopy(cached_decision)
+                decision_data['cache_hit'] = True
+            else:
+                # Get Gemini's analysis
+                response_text = await self._generate_json_async(prompt, _DECISION_RESPONSE_SCHEMA)
+                
+                if not response_text:
+                    raise ValueError("Empty response from Gemini AI")
+                
+                # Parse the response
+                decision_data = self._parse_gemini_response(response_text, commodity)
+                
+                # Don't cache fallback decisions so the next run asks Gemini again
+                if not decision_data.get('parsing_error'):
+                    with _decision_cache_lock:
+                        _decision_cache[cache_key] = copy.deepcopy(decision_data)
+                        if near_cache_key is not None:
+                            _decision_cache[near_cache_key] = _decision_cache[cache_key]
             
             # Add metadata
-            decision_data.update({
-                'commodity': commodity,
-                'timeframe_days': timeframe_days,
-                'analysis_timestamp': datetime.now().isoformat(),
-                'sentiment_score': sentiment_analysis.get('normalized_score', 50.0),
-                'trend_score': data_analysis.get('trend_score', 50.0),
-                'current_price': data_analysis.get('current_price', 0.0)
-            })
+            self._add_decision_metadata(decision_data, commodity, sentiment_analysis, data_analysis, timeframe_days)
             
-            logger.info(f"Trading decision for {commodity}: {decision_data.get('decision', 'UNKNOWN')}")
+            logger.info("Trading decision for %s: %s", commodity, decision_data.get('decision', 'UNKNOWN'))
             return decision_data
             
         except Exception as e:
-            logger.error(f"Error making trading decision for {commodity}: {e}")
-            return self._create_error_decision(commodity, str(e))
+            logger.error("Error making trading decision for %s: %s", commodity, e)
+            return self._create_error_decision(commodity, str(e), fatal=isinstance(e, _GEMINI_FATAL_ERRORS))
+    
+    def _get_fast_path_decision(self, commodity: str, sentiment_analysis: Dict, data_analysis: Dict,
+                                timeframe_days: int, risk_tolerance: str = 'moderate') -> Optional[Dict]:
+        """Return a rule-based decision when the signals are extreme enough that Gemini would only echo them"""
+        sentiment_score = sentiment_analysis.get('normalized_score', 50.0)
+        trend_score = data_analysis.get('trend_score', 50.0)
+        rsi = (data_analysis.get('technical_indicators') or _EMPTY).get('rsi', 50)
+        if sentiment_score is None or trend_score is None or rsi is None:
+            return None
+        
+        if sentiment_score >= _FAST_PATH_STRONG_SCORE and trend_score >= _FAST_PATH_STRONG_SCORE and rsi < 70:
+            template = _FAST_PATH_DECISIONS['BUY']
+        elif (sentiment_score <= 100 - _FAST_PATH_STRONG_SCORE and trend_score <= 100 - _FAST_PATH_STRONG_SCORE
+              and rsi > 30):
+            template = _FAST_PATH_DECISIONS['SELL']
+        else:
+            return None
+        
+        timeframe_category = _timeframe_category(timeframe_days)
+        decision_data = dict(template)
+        decision_data['position_size'] = _FAST_PATH_POSITION_SIZES.get(risk_tolerance, 'MEDIUM')
+        decision_data['time_horizon'] = timeframe_category
+        decision_data['timeframe_analysis'] = {
+            'timeframe_category': timeframe_category,
+            'timeframe_optimization': f"Rule-based decision for a {timeframe_days}-day timeframe",
+            'expected_holding_period': f"{timeframe_days} days",
+            'timeframe_risks': template['risks'],
+            'exit_strategy': 'Review the position if sentiment or trend scores fall back toward neutral'
+        }
+        decision_data['portfolio_adjustments'] = dict(_FAST_PATH_PORTFOLIO_ADJUSTMENTS)
+        decision_data['key_factors'] = [
+            f"Sentiment score {sentiment_score}/100",
+            f"Trend score {trend_score}/100",
+            f"RSI {rsi}"
+        ]
+        decision_data['email_subject'] = f"{commodity.upper()} {template['decision']} Recommendation"
+        decision_data['fast_path'] = True
+        return decision_data
+    
+    def _add_decision_metadata(self, decision_data: Dict, commodity: str, sentiment_analysis: Dict,
+                               data_analysis: Dict, timeframe_days: int) -> Dict:
+        """Attach analysis metadata to a parsed trading decision"""
+        decision_data.update({
+            'commodity': commodity,
+            'timeframe_days': timeframe_days,
+            'analysis_timestamp': datetime.now(timezone.utc).isoformat(),
+            'sentiment_score': sentiment_analysis.get('normalized_score', 50.0),
+            'trend_score': data_analysis.get('trend_score', 50.0),
+            'current_price': data_analysis.get('current_price', 0.0)
+        })
+        return decision_data
     
     def _create_analysis_prompt(self, commodity: str, sentiment_analysis: Dict, 
                                data_analysis: Dict, timeframe_days: int, risk_tolerance: str = 'moderate',
-                               portfolio_context: Dict = None) -> str:
+                               portfolio_context: Dict = None, market_section: str = None) -> str:
         """Create comprehensive prompt for Gemini analysis"""
+        if market_section is None:
+            market_section = self._create_market_data_section(commodity, sentiment_analysis, data_analysis, timeframe_days)
+        
+        # Fixed instructions first and per-call data last, so consecutive requests share
+        # a byte-identical prefix that Gemini can serve from its implicit cache
+        prompt = f"""{self._get_analysis_prompt_prefix(f"{timeframe_days}-day")}
+ASSET: {commodity.upper()}
+
+USER RISK TOLERANCE: {risk_tolerance.upper()}
+{self._get_risk_tolerance_description(risk_tolerance)}
+
+{self._get_portfolio_context_section(portfolio_context, commodity)}
+
+{market_section}
+"""
+        
+        return prompt
+    
+    @classmethod
+    @lru_cache(maxsize=64)
+    def _get_analysis_prompt_prefix(cls, timeframe_label: str) -> str:
+        """Get the asset-independent instructions that open every single-asset analysis prompt"""
+        return f"""
+You are an expert commodity trading advisor making investment decisions for the asset described below.
+
+TASK: Provide a comprehensive trading recommendation in the following JSON format:
+
+{cls._get_decision_schema(timeframe_label)}
+
+{cls._get_decision_guidelines(timeframe_label)}
+"""
+    
+    def _create_market_data_section(self, commodity: str, sentiment_analysis: Dict,
+                                    data_analysis: Dict, timeframe_days: int) -> str:
+        """Create the per-asset sentiment, price and technical section of the analysis prompt"""
+        
+        # Look up each nested section once
+        aggregate_sentiment = sentiment_analysis.get('aggregate_sentiment') or _EMPTY
+        price_analysis_data = data_analysis.get('price_analysis') or _EMPTY
+        technical = data_analysis.get('technical_indicators') or _EMPTY
+        trend_analysis = data_analysis.get('trend_analysis') or _EMPTY
+        volatility_analysis = data_analysis.get('volatility_analysis') or _EMPTY
+        volume_analysis = data_analysis.get('volume_analysis') or _EMPTY
+        support_resistance = data_analysis.get('support_resistance') or _EMPTY
         
         # Extract key metrics
         sentiment_score = sentiment_analysis.get('normalized_score', 50.0)
-        sentiment_label = sentiment_analysis.get('aggregate_sentiment', {}).get('label', 'neutral')
-        sentiment_confidence = sentiment_analysis.get('aggregate_sentiment', {}).get('confidence', 0.0)
+        sentiment_label = aggregate_sentiment.get('label', 'neutral')
+        sentiment_confidence = aggregate_sentiment.get('confidence', 0.0)
         total_articles = sentiment_analysis.get('total_articles', 0)
         
         trend_score = data_analysis.get('trend_score', 50.0)
         current_price = data_analysis.get('current_price', 0.0)
         
         # Get enhanced price analysis data
-        price_analysis_data = data_analysis.get('price_analysis', {})
         decision_period_change = price_analysis_data.get('decision_period_change', 0.0)
         full_period_change = price_analysis_data.get('full_period_change', 0.0)
         performance_percentile = price_analysis_data.get('performance_percentile', 50.0)
         historical_periods = price_analysis_data.get('historical_periods_analyzed', 0)
         analysis_depth = price_analysis_data.get('analysis_depth_days', 0)
         
-        trend_direction = data_analysis.get('trend_analysis', {}).get('trend_direction', 'sideways')
-        volatility = data_analysis.get('volatility_analysis', {}).get('annualized_volatility', 0.0)
+        trend_direction = trend_analysis.get('trend_direction', 'sideways')
+        volatility = volatility_analysis.get('annualized_volatility', 0.0)
         
         # Technical indicators
-        technical = data_analysis.get('technical_indicators', {})
         rsi = technical.get('rsi', 50)
         macd_trend = technical.get('macd_trend', 'neutral')
         
-        prompt = f"""
-You are an expert commodity trading advisor analyzing {commodity.upper()} for investment decisions.
-
-TRADING TIMEFRAME: {timeframe_days} days (with {analysis_depth} days of historical context)
+        return f"""TRADING TIMEFRAME: {timeframe_days} days (with {analysis_depth} days of historical context)
 CRITICAL: All recommendations must be optimized for this specific {timeframe_days}-day trading timeframe.
 
 SENTIMENT ANALYSIS:
 - Sentiment Score: {sentiment_score}/100 (where 0=very negative, 50=neutral, 100=very positive)
 - Overall Sentiment: {sentiment_label} (confidence: {sentiment_confidence:.2f})
 - Articles Analyzed: {total_articles}
-- Sentiment Distribution: {sentiment_analysis.get('sentiment_breakdown', {})}
+- Sentiment Distribution: {orjson.dumps(_compact_sentiment_breakdown(sentiment_analysis.get('sentiment_breakdown'))).decode()}
 
 ENHANCED PRICE ANALYSIS (Extended Historical Context):
 - Current Price: ${current_price:.4f}
@@ -295,24 +1364,21 @@ TECHNICAL INDICATORS:
 - MACD Trend: {macd_trend}
 
 VOLUME & MOMENTUM:
-- Volume Trend: {data_analysis.get('volume_analysis', {}).get('volume_trend', 'neutral')}
+- Volume Trend: {volume_analysis.get('volume_trend', 'neutral')}
 - Short-term Momentum: {price_analysis_data.get('momentum_short_term', 0):.2f}%
 - Medium-term Momentum: {price_analysis_data.get('momentum_medium_term', 0):.2f}%
 - Long-term Momentum: {price_analysis_data.get('momentum_long_term', 0):.2f}%
 - Recent vs Historical Performance: {price_analysis_data.get('recent_vs_historical', 0):+.2f}% difference
 
 SUPPORT & RESISTANCE:
-- Nearest Support: ${data_analysis.get('support_resistance', {}).get('nearest_support', 'N/A')}
-- Nearest Resistance: ${data_analysis.get('support_resistance', {}).get('nearest_resistance', 'N/A')}
-
-USER RISK TOLERANCE: {risk_tolerance.upper()}
-{self._get_risk_tolerance_description(risk_tolerance)}
-
-{self._get_portfolio_context_section(portfolio_context, commodity)}
-
-TASK: Provide a comprehensive trading recommendation in the following JSON format:
-
-{{
+- Nearest Support: ${support_resistance.get('nearest_support', 'N/A')}
+- Nearest Resistance: ${support_resistance.get('nearest_resistance', 'N/A')}"""
+    
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def _get_decision_schema(timeframe_label: str) -> str:
+        """Get the JSON schema Gemini must follow for a single trading decision"""
+        return f"""{{
     "decision": "BUY" | "SELL" | "HOLD",
     "confidence": 0.0-1.0,
     "target_price": "price target if BUY/SELL, null if HOLD",
@@ -322,7 +1388,7 @@ TASK: Provide a comprehensive trading recommendation in the following JSON forma
     "risk_level": "LOW" | "MEDIUM" | "HIGH",
     "timeframe_analysis": {{
         "timeframe_category": "SHORT" | "MEDIUM" | "LONG",
-        "timeframe_optimization": "how the strategy is optimized for {timeframe_days}-day timeframe",
+        "timeframe_optimization": "how the strategy is optimized for {timeframe_label} timeframe",
         "expected_holding_period": "expected days to hold position",
         "timeframe_risks": "specific risks for this timeframe",
         "exit_strategy": "when and how to exit the position"
@@ -344,9 +1410,13 @@ TASK: Provide a comprehensive trading recommendation in the following JSON forma
     }},
     "email_subject": "Professional email subject for broker",
     "email_body": "Professional email body for broker with specific trade instructions and position recommendations"
-}}
-
-GUIDELINES:
+}}"""
+    
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def _get_decision_guidelines(timeframe_label: str) -> str:
+        """Get the decision guidelines appended to trading analysis prompts"""
+        return f"""GUIDELINES:
 1. Consider both sentiment and technical analysis equally
 2. Factor in volatility and risk management
 3. IMPORTANT: Adjust recommendations based on user's risk tolerance level
@@ -357,7 +1427,7 @@ GUIDELINES:
 8. Ensure all recommendations are financially sound and well-reasoned
 9. Conservative users should get safer recommendations with tighter stops
 10. Aggressive users can handle higher risk/reward scenarios
-11. TIMEFRAME-SPECIFIC CONSIDERATIONS: Adjust strategy based on {timeframe_days}-day timeframe
+11. TIMEFRAME-SPECIFIC CONSIDERATIONS: Adjust strategy based on {timeframe_label} timeframe
 12. For SHORT timeframes (1-7 days): Focus on momentum, news impact, and quick technical signals
 13. For MEDIUM timeframes (8-30 days): Balance technical trends with fundamental sentiment
 14. For LONG timeframes (31+ days): Emphasize fundamental analysis and longer-term trends
@@ -378,21 +1448,12 @@ GUIDELINES:
 29. Recommend selling positions that conflict with new trade thesis or risk management
 30. Include specific asset names and quantities to sell when recommending position changes
 31. Explain the rationale for sell recommendations in portfolio context
-32. Ensure no placeholders are used!
-
-Respond with ONLY the JSON object, no additional text.
-"""
-        
-        return prompt
+32. Ensure no placeholders are used!"""
     
     def _get_portfolio_context_section(self, portfolio_context: Dict, commodity: str) -> str:
         """Generate portfolio context section for the prompt"""
         if not portfolio_context or "error" in portfolio_context:
-            return """
-PORTFOLIO CONTEXT: No portfolio information available
-- Treating as new investor with no existing positions
-- Recommendations should consider starting a new position
-"""
+            return _NO_PORTFOLIO_SECTION
         
         total_value = portfolio_context.get("total_value", 0)
         portfolios = portfolio_context.get("portfolios", [])
@@ -400,13 +1461,13 @@ PORTFOLIO CONTEXT: No portfolio information available
         diversification_score = portfolio_context.get("diversification_score", 0)
         current_asset_exposure = portfolio_context.get("current_asset_exposure", {})
         
-        portfolio_section = f"""
+        parts = [f"""
 PORTFOLIO CONTEXT:
 - Total Portfolio Value: ${total_value:,.2f}
 - Number of Portfolios: {len(portfolios)}
 - Diversification Score: {diversification_score}/100
 - Current Asset Holdings: {len(asset_exposure)} different assets
-"""
+"""]
         
         # Add current asset exposure if available
         if current_asset_exposure:
@@ -415,157 +1476,108 @@ PORTFOLIO CONTEXT:
             exposure_percent = current_asset_exposure.get("percentage", 0)
             
             if has_position:
-                portfolio_section += f"""
+                parts.append(f"""
 - CURRENT POSITION IN {commodity.upper()}: ${exposure_value:,.2f} ({exposure_percent:.1f}% of portfolio)
 - This is an EXISTING POSITION - consider whether to add, reduce, or maintain
-"""
+""")
             else:
-                portfolio_section += f"""
+                parts.append(f"""
 - NO CURRENT POSITION IN {commodity.upper()}
 - This would be a NEW POSITION - consider portfolio diversification impact
-"""
+""")
         
-        # Add top holdings for context and sell recommendations
-        if asset_exposure:
-            sorted_holdings = sorted(asset_exposure.items(), key=lambda x: x[1], reverse=True)
-            top_holdings = sorted_holdings[:5]  # Top 5 holdings
-            
-            portfolio_section += f"""
-- TOP HOLDINGS (for potential sell recommendations):
-"""
-            for asset, value in top_holdings:
-                percentage = (value / total_value * 100) if total_value > 0 else 0
-                portfolio_section += f"  • {asset}: ${value:,.2f} ({percentage:.1f}%)\n"
-        
-        # Add portfolio-specific guidance
-        portfolio_section += f"""
-PORTFOLIO CONSIDERATIONS:
-- Diversification: {'Well diversified' if diversification_score > 70 else 'Could benefit from more diversification' if diversification_score < 40 else 'Moderately diversified'}
-- Position Sizing: Consider current portfolio size (${total_value:,.2f}) when recommending position size
-- Risk Management: Existing positions may affect overall portfolio risk
-- Rebalancing: Consider if this trade helps achieve better portfolio balance
-
-POSITION ADJUSTMENT GUIDANCE:
-- Current Portfolio Value: ${total_value:,.2f}
-- Recommended position sizes: 5-10% for conservative, 10-15% for moderate, 15-25% for aggressive
-- If user has existing position: Provide specific INCREASE/DECREASE/MAINTAIN/CLOSE recommendation
-- If user has no position: Recommend appropriate portfolio percentage allocation
-- Consider impact on overall portfolio risk and diversification
-- Factor in user's risk tolerance when recommending position sizes
-
-SELL RECOMMENDATIONS GUIDANCE:
-- ALWAYS suggest which existing positions to sell to fund new trades
-- Consider selling underperforming positions to fund better opportunities
-- Recommend selling overexposed positions to improve diversification
-- Include specific asset names and quantities in sell recommendations
-- Explain rationale for sell recommendations in portfolio context
-- Consider selling positions that conflict with new trade thesis
-"""
-        
-        return portfolio_section
-    
-    def _get_risk_tolerance_description(self, risk_tolerance: str) -> str:
-        """Get detailed description for risk tolerance level"""
-        descriptions = {
-            'conservative': """
-- Prioritize capital preservation over growth
-- Prefer stable, dividend-paying assets with low volatility
-- Use tight stop-losses (2-5% maximum)
-- Smaller position sizes (SMALL to MEDIUM)
-- Avoid speculative trades and high-volatility periods
-- Focus on well-established, liquid markets""",
-            'moderate': """
-- Balance growth potential with reasonable risk management
-- Accept moderate volatility for steady returns
-- Use standard stop-losses (5-10% range)
-- Medium position sizes typically appropriate
-- Mix of conservative and growth-oriented strategies
-- Consider both technical and fundamental factors equally""",
-            'aggressive': """
-- Prioritize growth potential over safety
-- Accept higher volatility for potentially higher returns
-- Use wider stop-losses (10-15% range) to avoid premature exits
-- Larger position sizes acceptable (MEDIUM to LARGE)
-- Willing to take contrarian positions
-- Focus on momentum and growth opportunities""",
-            'very_aggressive': """
-- Maximum growth potential is the primary goal
-- Accept very high volatility and significant drawdown risk
-- Use wide stop-losses (15-20%+ range) or no stops for long-term positions
-- Large position sizes acceptable
-- Comfortable with speculative trades and emerging opportunities
-- May ignore short-term market noise for long-term gains"""
-        }
-        return descriptions.get(risk_tolerance, descriptions['moderate'])
+        # Add top holdings for context and sell recommendations
+        if asset_exposure:
+            top_holdings = heapq.nlargest(5, asset_exposure.items(), key=operator.itemgetter(1))  # Top 5 holdings
+            
+            parts.append("""
+- TOP HOLDINGS (for potential sell recommendations):
+""")
+            for asset, value in top_holdings:
+                percentage = (value / total_value * 100) if total_value > 0 else 0
+                parts.append(f"  • {asset}: ${value:,.2f} ({percentage:.1f}%)\n")
+        
+        # Add portfolio-specific guidance
+        parts.append(f"""
+PORTFOLIO CONSIDERATIONS:
+- Diversification: {'Well diversified' if diversification_score > 70 else 'Could benefit from more diversification' if diversification_score < 40 else 'Moderately diversified'}
+- Position Sizing: Consider current portfolio size (${total_value:,.2f}) when recommending position size
+- Risk Management: Existing positions may affect overall portfolio risk
+- Rebalancing: Consider if this trade helps achieve better portfolio balance
+
+POSITION ADJUSTMENT GUIDANCE:
+- Current Portfolio Value: ${total_value:,.2f}
+""")
+        parts.append(_POSITION_AND_SELL_GUIDANCE)
+        
+        return "".join(parts)
+    
+    @staticmethod
+    @lru_cache(maxsize=8)
+    def _get_risk_tolerance_description(risk_tolerance: str) -> str:
+        """Get detailed description for risk tolerance level"""
+        return _RISK_TOLERANCE_DESCRIPTIONS.get(risk_tolerance, _RISK_TOLERANCE_DESCRIPTIONS['moderate'])
     
     def _parse_gemini_response(self, response_text: str, commodity: str) -> Dict:
         """Parse Gemini's JSON response"""
         try:
-            # Clean the response text
-            response_text = response_text.strip()
-            
             # Remove markdown code blocks if present
-            if response_text.startswith('```json'):
-                response_text = response_text[7:]
-            if response_text.startswith('```'):
-                response_text = response_text[3:]
-            if response_text.endswith('```'):
-                response_text = response_text[:-3]
-            
-            response_text = response_text.strip()
+            response_text = _strip_code_fence(response_text)
             
             # Parse JSON
-            decision_data = json.loads(response_text)
-            
-            # Validate required fields
-            required_fields = ['decision', 'confidence', 'reasoning']
-            for field in required_fields:
-                if field not in decision_data:
-                    raise ValueError(f"Missing required field: {field}")
-            
-            # Validate decision value
-            valid_decisions = ['BUY', 'SELL', 'HOLD']
-            if decision_data['decision'] not in valid_decisions:
-                raise ValueError(f"Invalid decision: {decision_data['decision']}")
-            
-            # Ensure confidence is between 0 and 1
-            confidence = float(decision_data['confidence'])
-            if not 0.0 <= confidence <= 1.0:
-                confidence = max(0.0, min(1.0, confidence))
-                decision_data['confidence'] = confidence
-            
-            # Set defaults for optional fields
-            defaults = {
-                'target_price': None,
-                'stop_loss': None,
-                'position_size': 'MEDIUM',
-                'time_horizon': 'MEDIUM',
-                'risk_level': 'MEDIUM',
-                'key_factors': [],
-                'risks': 'Standard market risks apply',
-                'market_outlook': 'Market analysis pending',
-                'email_subject': f'{commodity.upper()} Trading Recommendation',
-                'email_body': 'Trading recommendation analysis attached.'
-            }
-            
-            for key, default_value in defaults.items():
-                if key not in decision_data:
-                    decision_data[key] = default_value
+            decision_data = _loads_model_json(response_text)
             
-            return decision_data
+            return self._validate_decision_data(decision_data, commodity)
             
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON parsing error: {e}")
-            logger.error(f"Response text: {response_text}")
+        except orjson.JSONDecodeError as e:
+            logger.error("JSON parsing error: %s", e)
+            logger.error("Response text: %s", response_text)
             return self._create_fallback_decision(commodity, response_text)
         
         except Exception as e:
-            logger.error(f"Error parsing Gemini response: {e}")
+            logger.error("Error parsing Gemini response: %s", e)
             return self._create_fallback_decision(commodity, response_text)
     
+    def _validate_decision_data(self, decision_data: Dict, commodity: str) -> Dict:
+        """Validate a parsed trading decision and fill in defaults for optional fields"""
+        # Validate required fields
+        for field in _REQUIRED_DECISION_FIELDS:
+            if field not in decision_data:
+                raise ValueError(f"Missing required field: {field}")
+        
+        # Validate decision value
+        if decision_data['decision'] not in _VALID_DECISIONS:
+            raise ValueError(f"Invalid decision: {decision_data['decision']}")
+        
+        # Ensure confidence is between 0 and 1
+        confidence = float(decision_data['confidence'])
+        if not 0.0 <= confidence <= 1.0:
+            confidence = max(0.0, min(1.0, confidence))
+            decision_data['confidence'] = confidence
+        
+        # Set defaults for optional fields
+        defaults = {
+            'target_price': None,
+            'stop_loss': None,
+            'position_size': 'MEDIUM',
+            'time_horizon': 'MEDIUM',
+            'risk_level': 'MEDIUM',
+            'key_factors': [],
+            'risks': 'Standard market risks apply',
+            'market_outlook': 'Market analysis pending',
+            'email_subject': f'{commodity.upper()} Trading Recommendation',
+            'email_body': 'Trading recommendation analysis attached.'
+        }
+        
+        for key, default_value in defaults.items():
+            if key not in decision_data:
+                decision_data[key] = default_value
+        
+        return decision_data
+    
     def _create_fallback_decision(self, commodity: str, response_text: str) -> Dict:
         """Create a fallback decision when parsing fails"""
-        logger.warning(f"Creating fallback decision for {commodity}")
+        logger.warning("Creating fallback decision for %s", commodity)
         
         # Try to extract decision from text
         decision = 'HOLD'  # Default conservative decision
@@ -596,9 +1608,9 @@ SELL RECOMMENDATIONS GUIDANCE:
             'parsing_error': True
         }
     
-    def _create_error_decision(self, commodity: str, error_message: str) -> Dict:
-        """Create error decision result"""
-        return {
+    def _create_error_decision(self, commodity: str, error_message: str, fatal: bool = False) -> Dict:
+        """Create error decision result, flagged 'fatal' when other Gemini requests would fail the same way"""
+        decision = {
             'commodity': commodity,
             'decision': 'HOLD',
             'confidence': 0.0,
@@ -614,8 +1626,11 @@ SELL RECOMMENDATIONS GUIDANCE:
             'email_subject': f'{commodity.upper()} Analysis Error',
             'email_body': f'Error occurred during {commodity} analysis: {error_message}',
             'error': error_message,
-            'analysis_timestamp': datetime.now().isoformat()
+            'analysis_timestamp': datetime.now(timezone.utc).isoformat()
         }
+        if fatal:
+            decision['fatal'] = True
+        return decision
     
     async def generate_market_summary(self, commodity_analyses: List[Dict]) -> Dict:
         """
@@ -627,6 +1642,8 @@ SELL RECOMMENDATIONS GUIDANCE:
         Returns:
             Dict containing market summary and insights
         """
+        analysis_timestamp = datetime.now(timezone.utc).isoformat()
+        
         try:
             if not commodity_analyses:
                 return {'error': 'No commodity analyses provided'}
@@ -634,31 +1651,39 @@ SELL RECOMMENDATIONS GUIDANCE:
             # Create summary prompt
             summary_prompt = self._create_summary_prompt(commodity_analyses)
             
-            # Get Gemini's market summary
-            response = self.model.generate_content(summary_prompt)
-            
-            if not response.text:
-                raise ValueError("Empty response from Gemini AI")
-            
-            # Parse the summary
-            summary_data = self._parse_summary_response(response.text)
+            # The prompt is built from the analyses, so it identifies the summary
+            cache_key = f"market_summary:{_prompt_cache_key(summary_prompt)}"
+            summary_data = _disk_cache_get(cache_key)
+            if summary_data is not None:
+                logger.info("Using cached market summary")
+            else:
+                # Get Gemini's market summary
+                response_text = await self._generate_json_async(summary_prompt, model=self.summary_model)
+                
+                if not response_text:
+                    raise ValueError("Empty response from Gemini AI")
+                
+                # Parse the summary
+                summary_data = self._parse_summary_response(response_text)
+                if 'error' not in summary_data:
+                    _disk_cache_set(cache_key, summary_data)
             
             # Add metadata
             summary_data.update({
                 'commodities_analyzed': len(commodity_analyses),
-                'analysis_timestamp': datetime.now().isoformat()
+                'analysis_timestamp': analysis_timestamp
             })
             
             return summary_data
             
         except Exception as e:
-            logger.error(f"Error generating market summary: {e}")
+            logger.error("Error generating market summary: %s", e)
             return {
                 'error': str(e),
-                'analysis_timestamp': datetime.now().isoformat()
+                'analysis_timestamp': analysis_timestamp
             }
     
-    async def generate_search_terms(self, asset: str, timeframe_days: int) -> List[str]:
+    async def generate_search_terms(self, asset: str, timeframe_days: int) -> Tuple[str, ...]:
         """
         Generate intelligent, relevant search terms for asset news scraping
         
@@ -667,209 +1692,170 @@ SELL RECOMMENDATIONS GUIDANCE:
             timeframe_days: Analysis timeframe
             
         Returns:
-            List of optimized search terms
+            Tuple of optimized search terms (shared with the cache, so read-only)
         """
-        try:
-            # Determine asset type
-            from config import Config
-            config = Config()
-            
-            if asset.lower() in config.COMMODITY_SYMBOLS:
-                asset_type = "commodity"
-                market_context = "commodity markets"
-            elif asset.lower() in config.STOCK_SYMBOLS:
-                asset_type = "stock"
-                # Check if it's an Indian stock
-                indian_stocks = ['tata', 'reliance', 'infosys', 'tcs', 'hdfc', 'icici', 'sbi', 'bharti', 
-                               'adani', 'wipro', 'hcl', 'maruti', 'bajaj', 'mahindra', 'itc', 'hindalco']
-                if any(indian_stock in asset.lower() for indian_stock in indian_stocks):
-                    market_context = "Indian stock markets (NSE, BSE, Sensex, Nifty) and equity analysis"
-                else:
-                    market_context = "stock markets and equity analysis"
-            else:
-                asset_type = "unknown"
-                market_context = "financial markets"
-            
-            logger.info(f"Generating intelligent search terms for {asset} ({asset_type})")
+        search_terms = await self.generate_search_terms_batch([(asset, timeframe_days)])
+        return search_terms[asset]
+    
+    async def generate_search_terms_batch(self, assets: List[Tuple[str, int]]) -> Dict[str, Tuple[str, ...]]:
+        """
+        Generate search terms for several assets with a single Gemini call
+        
+        Args:
+            assets: List of (asset name, analysis timeframe in days) pairs
             
-            prompt = f"""
-You are an expert financial analyst specializing in {market_context}. Generate the most effective search terms for finding recent news articles about {asset.upper()} that would impact trading decisions.
-
+        Returns:
+            Dict mapping each asset name to its tuple of search terms
+        """
+        if not assets:
+            return {}
+        
+        asset_names = [asset for asset, _ in assets]
+        
+        search_terms = {}
+        pending = []
+        with _search_terms_cache_lock:
+            for asset, timeframe_days in assets:
+                cached = _search_terms_cache.get(_search_terms_cache_key(asset, timeframe_days))
+                if cached is not None:
+                    search_terms[asset] = cached
+                else:
+                    pending.append((asset, timeframe_days))
+        
+        if pending:
+            # Terms stored on disk by an earlier run
+            stored = [(asset, timeframe_days, _disk_cache_get(_search_terms_disk_key(asset, timeframe_days)))
+                      for asset, timeframe_days in pending]
+            pending = []
+            with _search_terms_cache_lock:
+                for asset, timeframe_days, terms in stored:
+                    if terms is not None:
+                        search_terms[asset] = tuple(terms)
+                        _search_terms_cache[_search_terms_cache_key(asset, timeframe_days)] = search_terms[asset]
+                    else:
+                        pending.append((asset, timeframe_days))
+        
+        if pending:
+            search_terms.update(await self._request_search_terms(pending))
+        
+        missing = [(asset, timeframe_days) for asset, timeframe_days in pending if asset not in search_terms]
+        if missing and len(pending) > 1:
+            # Retry only the assets the batched answer got wrong, one call each
+            retried = await asyncio.gather(*(self.generate_search_terms(asset, timeframe_days)
+                                             for asset, timeframe_days in missing))
+            search_terms.update(zip((asset for asset, _ in missing), retried))
+        else:
+            for asset, _ in missing:
+                # Fallback to enhanced default terms
+                search_terms[asset] = self._get_fallback_search_terms(asset)
+        
+        for asset in asset_names:
+            logger.info("Generated %d search terms for %s: %s", len(search_terms[asset]), asset, search_terms[asset])
+        return search_terms
+    
+    async def _request_search_terms(self, assets: List[Tuple[str, int]]) -> Dict[str, Tuple[str, ...]]:
+        """Ask Gemini for search terms and cache every asset it answered usably"""
+        asset_names = [asset for asset, _ in assets]
+        
+        try:
+            asset_sections = []
+            for asset, timeframe_days in assets:
+                asset_type, market_context = self._describe_asset(asset)
+                logger.info("Generating intelligent search terms for %s (%s)", asset, asset_type)
+                asset_sections.append(f"""ASSET KEY: {asset}
 ASSET: {asset.upper()}
 ASSET TYPE: {asset_type.upper()}
+MARKET CONTEXT: {market_context}
 ANALYSIS TIMEFRAME: {timeframe_days} days
-
-Generate search terms that will find:
-1. Price movement news and analysis
-2. Company/supply fundamentals (earnings, production, demand)
-3. Economic indicators affecting this asset
-4. Geopolitical events impacting the market
-5. Industry-specific developments and disruptions
-6. Technical analysis and trading signals
-7. Analyst upgrades/downgrades (for stocks)
-8. Regulatory news and policy changes
-
-GUIDELINES FOR {asset_type.upper()}S:
-- Use specific terminology that financial news sites would use
-- Include both the asset name and related market/sector terms
-- Consider earnings seasons, economic cycles, and market events
-- Mix broad and specific terms for comprehensive coverage
-- Include terms that traders and analysts would search for
-- For stocks: Include company name, ticker symbol, sector terms
-- For commodities: Include supply/demand factors, seasonal patterns
-- For Indian stocks: Include NSE, BSE, Sensex, Nifty, Indian market terms
-- For Indian markets: Include terms like "Indian stock market", "Mumbai stock exchange", "Indian equity"
-
-Return exactly 8-12 highly relevant search terms as a JSON array.
-Focus on terms that would appear in headlines and articles about market-moving events.
-
-Example format: ["term1", "term2", "term3", ...]
-
-Respond with ONLY the JSON array, no additional text.
-"""
+""")
             
-            response = self.model.generate_content(prompt)
+            prompt = "\n".join(asset_sections)
+            response_text = await self._generate_json_async(prompt, model=self.search_terms_model)
             
-            if not response.text:
+            if not response_text:
                 raise ValueError("Empty response from Gemini AI")
             
             # Parse the JSON response
-            search_terms = self._parse_search_terms_response(response.text, asset)
-            
-            logger.info(f"Generated {len(search_terms)} search terms for {asset}: {search_terms}")
-            return search_terms
+            search_terms = self._parse_search_terms_response(response_text, asset_names)
             
         except Exception as e:
-            logger.error(f"Error generating search terms for {asset}: {e}")
-            # Fallback to enhanced default terms
-            return self._get_fallback_search_terms(asset)
+            logger.error("Error generating search terms for %s: %s", ', '.join(asset_names), e)
+            return {}
+        
+        with _search_terms_cache_lock:
+            for asset, timeframe_days in assets:
+                if asset in search_terms:
+                    _search_terms_cache[_search_terms_cache_key(asset, timeframe_days)] = search_terms[asset]
+        for asset, timeframe_days in assets:
+            if asset in search_terms:
+                _disk_cache_set(_search_terms_disk_key(asset, timeframe_days), search_terms[asset])
+        
+        return search_terms
+    
+    def _describe_asset(self, asset: str) -> Tuple[str, str]:
+        """Get the asset type and market context used to steer search term generation"""
+        # Determine asset type
+        asset_key = asset.lower()
+        
+        if asset_key in _COMMODITY_ASSETS:
+            asset_type = "commodity"
+            market_context = "commodity markets"
+        elif asset_key in _STOCK_ASSETS:
+            asset_type = "stock"
+            # Check if it's an Indian stock
+            if _is_indian_stock(asset_key):
+                market_context = "Indian stock markets (NSE, BSE, Sensex, Nifty) and equity analysis"
+            else:
+                market_context = "stock markets and equity analysis"
+        else:
+            asset_type = "unknown"
+            market_context = "financial markets"
+        
+        return asset_type, market_context
     
-    def _parse_search_terms_response(self, response_text: str, commodity: str) -> List[str]:
-        """Parse Gemini's search terms response"""
+    def _parse_search_terms_response(self, response_text: str, assets: List[str]) -> Dict[str, Tuple[str, ...]]:
+        """Parse Gemini's search terms response, keeping only assets with a usable term list"""
         try:
-            # Clean the response text
-            response_text = response_text.strip()
-            
             # Remove markdown code blocks if present
-            if response_text.startswith('```json'):
-                response_text = response_text[7:]
-            if response_text.startswith('```'):
-                response_text = response_text[3:]
-            if response_text.endswith('```'):
-                response_text = response_text[:-3]
-            
-            response_text = response_text.strip()
+            response_text = _strip_code_fence(response_text)
             
             # Parse JSON
-            search_terms = json.loads(response_text)
+            terms_by_asset = _loads_model_json(response_text)
+            
+            if not isinstance(terms_by_asset, dict):
+                raise ValueError("Invalid search terms format")
+            
+        except Exception as e:
+            logger.warning("Error parsing search terms response: %s", e)
+            return {}
+        
+        terms_by_key = {str(key).lower(): terms for key, terms in terms_by_asset.items()}
+        
+        parsed = {}
+        for asset in assets:
+            search_terms = terms_by_key.get(asset.lower())
             
             # Validate and clean terms
             if isinstance(search_terms, list):
-                cleaned_terms = []
-                for term in search_terms:
-                    if isinstance(term, str) and len(term.strip()) > 2:
-                        cleaned_terms.append(term.strip())
+                cleaned_terms = tuple(stripped for term in search_terms
+                                      if isinstance(term, str) and len(stripped := term.strip()) > 2)
                 
                 if len(cleaned_terms) >= 3:  # Minimum viable terms
-                    return cleaned_terms[:15]  # Limit to 15 terms max
-            
-            raise ValueError("Invalid search terms format")
+                    parsed[asset] = cleaned_terms[:15]  # Limit to 15 terms max
+                    continue
             
-        except Exception as e:
-            logger.warning(f"Error parsing search terms response: {e}")
-            return self._get_fallback_search_terms(commodity)
+            logger.warning("Invalid search terms format for %s", asset)
+        
+        return parsed
     
-    def _get_fallback_search_terms(self, asset: str) -> List[str]:
+    def _get_fallback_search_terms(self, asset: str) -> Tuple[str, ...]:
         """Generate enhanced fallback search terms for assets"""
-        base_terms = [asset, asset.replace('_', ' ')]
-        
-        # Determine asset type for better fallback terms
-        from config import Config
-        config = Config()
-        
-        if asset.lower() in config.STOCK_SYMBOLS:
-            # Stock-specific fallback terms
-            symbol = config.STOCK_SYMBOLS[asset.lower()]
-            base_terms.extend([
-                f'{asset} stock analysis', f'{asset} earnings', f'{asset} price target',
-                f'{asset} analyst rating', f'{symbol} stock', f'{asset} quarterly results',
-                f'{asset} revenue growth', f'{asset} stock forecast', f'{asset} market cap',
-                f'{asset} investment outlook'
-            ])
-            
-            # Add Indian market-specific terms for Indian stocks
-            indian_stocks = ['tata', 'reliance', 'infosys', 'tcs', 'hdfc', 'icici', 'sbi', 'bharti', 
-                           'adani', 'wipro', 'hcl', 'maruti', 'bajaj', 'mahindra', 'itc', 'hindalco']
-            if any(indian_stock in asset.lower() for indian_stock in indian_stocks):
-                base_terms.extend([
-                    f'{asset} NSE BSE', f'{asset} Indian stock market', f'{asset} Sensex Nifty',
-                    f'{asset} Indian equity', f'{asset} Mumbai stock exchange', f'{asset} Indian shares',
-                    f'{asset} Indian market analysis', f'{asset} Indian stock news'
-                ])
-        else:
-            # Commodity fallback terms (existing logic)
-            pass
-        
-        # Enhanced commodity-specific terms
-        enhanced_terms = {
-            'gold': [
-                'gold price forecast', 'gold market analysis', 'gold futures trading',
-                'precious metals outlook', 'gold inflation hedge', 'central bank gold reserves',
-                'gold mining stocks', 'gold ETF flows', 'dollar gold correlation'
-            ],
-            'silver': [
-                'silver price prediction', 'silver industrial demand', 'silver mining supply',
-                'silver gold ratio', 'precious metals rally', 'silver investment demand',
-                'silver market fundamentals', 'silver futures analysis'
-            ],
-            'crude_oil': [
-                'oil price forecast', 'crude oil inventory', 'OPEC production cuts',
-                'oil demand outlook', 'refinery capacity', 'oil geopolitics',
-                'WTI crude analysis', 'energy market trends', 'oil supply disruption'
-            ],
-            'natural_gas': [
-                'natural gas price forecast', 'gas storage levels', 'LNG exports',
-                'gas demand winter', 'pipeline capacity', 'gas production growth',
-                'energy transition gas', 'gas market fundamentals'
-            ],
-            'copper': [
-                'copper price outlook', 'copper demand china', 'copper mine supply',
-                'industrial metals forecast', 'copper construction demand', 'EV copper demand',
-                'copper inventory levels', 'base metals analysis'
-            ],
-            'wheat': [
-                'wheat price forecast', 'wheat crop conditions', 'grain export restrictions',
-                'wheat supply outlook', 'agricultural commodities', 'food inflation wheat',
-                'wheat harvest estimates', 'grain market analysis'
-            ],
-            'corn': [
-                'corn price prediction', 'corn crop yield', 'ethanol demand corn',
-                'grain export demand', 'corn planting progress', 'feed demand corn',
-                'agricultural weather corn', 'corn futures analysis'
-            ],
-            'soybeans': [
-                'soybean price outlook', 'soy crop conditions', 'china soybean imports',
-                'soybean crush margins', 'agricultural trade war', 'soy meal demand',
-                'brazil soybean harvest', 'oilseed market trends'
-            ]
-        }
-        
-        if asset in enhanced_terms:
-            base_terms.extend(enhanced_terms[asset])
-        else:
-            # Generic asset terms
-            base_terms.extend([
-                f'{asset} price analysis', f'{asset} market outlook',
-                f'{asset} supply demand', f'{asset} futures trading',
-                f'{asset} investment forecast'
-            ])
-        
-        return base_terms
+        return _fallback_search_terms(asset)
     
     def _create_summary_prompt(self, analyses: List[Dict]) -> str:
         """Create prompt for market summary"""
-        
-        commodity_summaries = []
+        # Fixed instructions live in the summary model's system instruction
+        parts = ["INDIVIDUAL COMMODITY ANALYSES:\n"]
         for analysis in analyses:
             commodity = analysis.get('commodity', 'Unknown')
             decision = analysis.get('decision', 'HOLD')
@@ -877,83 +1863,31 @@ Respond with ONLY the JSON array, no additional text.
             sentiment_score = analysis.get('sentiment_score', 50.0)
             trend_score = analysis.get('trend_score', 50.0)
             
-            commodity_summaries.append(f"- {commodity.upper()}: {decision} (confidence: {confidence:.2f}, sentiment: {sentiment_score:.1f}/100, trend: {trend_score:.1f}/100)")
-        
-        prompt = f"""
-You are a senior commodity market analyst providing a comprehensive market overview.
-
-INDIVIDUAL COMMODITY ANALYSES:
-{chr(10).join(commodity_summaries)}
-
-TASK: Provide a comprehensive market summary in the following JSON format:
-
-{{
-    "overall_market_sentiment": "BULLISH" | "BEARISH" | "NEUTRAL",
-    "market_confidence": 0.0-1.0,
-    "key_themes": ["list", "of", "market", "themes"],
-    "sector_outlook": {{
-        "energy": "outlook for energy commodities",
-        "metals": "outlook for metal commodities", 
-        "agriculture": "outlook for agricultural commodities"
-    }},
-    "top_opportunities": ["commodity1", "commodity2", "commodity3"],
-    "top_risks": ["risk1", "risk2", "risk3"],
-    "diversification_advice": "portfolio diversification recommendations",
-    "market_summary": "comprehensive market overview and outlook",
-    "recommended_actions": ["action1", "action2", "action3"]
-}}
-
-Provide strategic insights based on the individual commodity analyses.
-Respond with ONLY the JSON object, no additional text.
-Take into account general market trends and macroeconomic factors for the commodity.
-"""
+            parts.append(f"- {commodity.upper()}: {decision} (confidence: {confidence:.2f}, sentiment: {sentiment_score:.1f}/100, trend: {trend_score:.1f}/100)\n")
         
-        return prompt
+        return "".join(parts)
     
     def _parse_summary_response(self, response_text: str) -> Dict:
         """Parse market summary response"""
         try:
-            # Clean the response text
-            response_text = response_text.strip()
-            
             # Remove markdown code blocks if present
-            if response_text.startswith('```json'):
-                response_text = response_text[7:]
-            if response_text.startswith('```'):
-                response_text = response_text[3:]
-            if response_text.endswith('```'):
-                response_text = response_text[:-3]
-            
-            response_text = response_text.strip()
+            response_text = _strip_code_fence(response_text)
             
             # Parse JSON
-            summary_data = json.loads(response_text)
+            summary_data = _loads_model_json(response_text)
             
-            # Set defaults for missing fields
-            defaults = {
-                'overall_market_sentiment': 'NEUTRAL',
-                'market_confidence': 0.5,
-                'key_themes': [],
-                'sector_outlook': {
-                    'energy': 'Neutral outlook',
-                    'metals': 'Neutral outlook',
-                    'agriculture': 'Neutral outlook'
-                },
-                'top_opportunities': [],
-                'top_risks': [],
-                'diversification_advice': 'Maintain diversified portfolio',
-                'market_summary': 'Market analysis completed',
-                'recommended_actions': []
-            }
+            if not isinstance(summary_data, dict):
+                raise ValueError("Invalid summary format")
             
-            for key, default_value in defaults.items():
-                if key not in summary_data:
-                    summary_data[key] = default_value
+            # Set defaults for missing or mistyped fields
+            for key, default_value in _SUMMARY_DEFAULTS.items():
+                if not isinstance(summary_data.get(key), _SUMMARY_FIELD_TYPES[key]):
+                    summary_data[key] = copy.deepcopy(default_value)
             
             return summary_data
             
         except Exception as e:
-            logger.error(f"Error parsing summary response: {e}")
+            logger.error("Error parsing summary response: %s", e)
             return {
                 'overall_market_sentiment': 'NEUTRAL',
                 'market_confidence': 0.0,
@@ -974,12 +1908,14 @@ Take into account general market trends and macroeconomic factors for the commod
             Dict containing comprehensive portfolio analysis
         """
         try:
-            logger.info(f"Starting portfolio analysis for user {user_email}, portfolio {portfolio_id}")
+            logger.info("Starting portfolio analysis for user %s, portfolio %s", user_email, portfolio_id)
             
-            # Get portfolio context
-            portfolio_context = self.get_portfolio_context(user_email, portfolio_id=portfolio_id)
+            # Get portfolio context; database access is blocking, so keep it off the event loop
+            portfolio_context = await _run_db_call(
+                self.get_portfolio_context, user_email, portfolio_id=portfolio_id
+            )
             if "error" in portfolio_context:
-                logger.error(f"Could not get portfolio context: {portfolio_context['error']}")
+                logger.error("Could not get portfolio context: %s", portfolio_context['error'])
                 return {
                     'success': False,
                     'error': f"Could not get portfolio context: {portfolio_context['error']}"
@@ -996,76 +1932,34 @@ Take into account general market trends and macroeconomic factors for the commod
                     'error': 'No holdings found in portfolio'
                 }
             
-            # Collect data for all holdings
+            # Download every holding's price history in one batched request while the
+            # per-holding news sentiment runs concurrently
+            symbols = list(dict.fromkeys(holding['asset_symbol'] for holding in all_holdings))
+            market_data, *sentiment_results = await asyncio.gather(
+                _run_blocking(self._fetch_holdings_market_data, symbols, timeframe_days),
+                *[
+                    self._analyze_holding_sentiment(holding.get('asset_name', holding['asset_symbol']), timeframe_days)
+                    for holding in all_holdings
+                ],
+                return_exceptions=True
+            )
+            
             holdings_data = {}
             sentiment_data = {}
-            
-            for holding in all_holdings:
+            for holding, sentiment_result in zip(all_holdings, sentiment_results):
                 asset_symbol = holding['asset_symbol']
-                logger.info(f"Collecting data for {asset_symbol}")
-                
-                # Get yfinance data
-                try:
-                    import yfinance as yf
-                    ticker = yf.Ticker(asset_symbol)
-                    hist = ticker.history(period=f"{timeframe_days}d")
-                    
-                    if not hist.empty:
-                        current_price = hist['Close'].iloc[-1]
-                        price_change = ((current_price - hist['Close'].iloc[0]) / hist['Close'].iloc[0]) * 100
-                        volume_avg = hist['Volume'].mean()
-                        
-                        holdings_data[asset_symbol] = {
-                            'current_price': float(current_price),
-                            'price_change_percentage': float(price_change),
-                            'volume_avg': float(volume_avg),
-                            'high_52w': float(hist['High'].max()),
-                            'low_52w': float(hist['Low'].min()),
-                            'volatility': float(hist['Close'].pct_change().std() * 100),
-                            'data_points': len(hist)
-                        }
-                    else:
-                        holdings_data[asset_symbol] = {
-                            'error': 'No data available from yfinance'
-                        }
-                except Exception as e:
-                    logger.error(f"Error fetching yfinance data for {asset_symbol}: {e}")
-                    holdings_data[asset_symbol] = {
-                        'error': f'Data fetch error: {str(e)}'
-                    }
-                
-                # Get sentiment analysis (simplified for portfolio analysis)
-                try:
-                    from nlp_analyzer import CommodityNLPAnalyzer
-                    nlp_analyzer = CommodityNLPAnalyzer()
-                    
-                    # Get asset name for sentiment analysis
-                    asset_name = holding.get('asset_name', asset_symbol)
-                    sentiment_result = await nlp_analyzer.analyze_sentiment_async(asset_name, timeframe_days)
-                    
-                    sentiment_data[asset_symbol] = {
-                        'sentiment_score': sentiment_result.get('normalized_score', 50.0),
-                        'total_articles': sentiment_result.get('total_articles', 0),
-                        'sentiment_label': sentiment_result.get('sentiment_label', 'neutral')
-                    }
-                except Exception as e:
-                    logger.error(f"Error getting sentiment for {asset_symbol}: {e}")
-                    sentiment_data[asset_symbol] = {
-                        'sentiment_score': 50.0,
-                        'total_articles': 0,
-                        'sentiment_label': 'neutral',
-                        'error': f'Sentiment error: {str(e)}'
-                    }
+                holdings_data[asset_symbol] = self._holding_market_data(asset_symbol, market_data)
+                sentiment_data[asset_symbol] = self._summarize_holding_sentiment(asset_symbol, sentiment_result)
             
             # Generate comprehensive portfolio analysis using Gemini
             analysis_result = await self._generate_portfolio_analysis(
-                portfolio_context, holdings_data, sentiment_data, timeframe_days
+                portfolio_context, holdings_data, sentiment_data, timeframe_days, all_holdings
             )
             
             return {
                 'success': True,
                 'portfolio_id': portfolio_id,
-                'analysis_date': datetime.now().isoformat(),
+                'analysis_date': datetime.now(timezone.utc).isoformat(),
                 'timeframe_days': timeframe_days,
                 'holdings_data': holdings_data,
                 'sentiment_data': sentiment_data,
@@ -1074,52 +1968,193 @@ Take into account general market trends and macroeconomic factors for the commod
             }
             
         except Exception as e:
-            logger.error(f"Error in portfolio analysis: {e}")
+            logger.error("Error in portfolio analysis: %s", e)
             return {
                 'success': False,
                 'error': f'Portfolio analysis failed: {str(e)}'
             }
     
+    def _get_portfolio_nlp_analyzer(self):
+        """Get the sentiment analyzer used for portfolio analysis, loading FinBERT only on first use"""
+        with self._portfolio_nlp_analyzer_lock:
+            if self._portfolio_nlp_analyzer is None:
+                # Imported here so importing this module doesn't load the NLP stack
+                from nlp_analyzer import CommodityNLPAnalyzer
+                self._portfolio_nlp_analyzer = CommodityNLPAnalyzer()
+            return self._portfolio_nlp_analyzer
+    
+    @staticmethod
+    def _holding_market_data(asset_symbol: str, market_data) -> Dict:
+        """Pick a holding's statistics out of the batched market data (or the error it raised)"""
+        if isinstance(market_data, Exception):
+            logger.error("Error fetching yfinance data for %s: %s", asset_symbol, market_data)
+            return {
+                'error': f'Data fetch error: {str(market_data)}'
+            }
+        
+        if asset_symbol not in market_data:
+            return {
+                'error': 'No data available from yfinance'
+            }
+        
+        return market_data[asset_symbol]
+    
+    @staticmethod
+    def _summarize_holding_sentiment(asset_symbol: str, sentiment_result) -> Dict:
+        """Reduce a sentiment analysis result (or the error it raised) to the fields portfolio analysis uses"""
+        if isinstance(sentiment_result, Exception):
+            logger.error("Error getting sentiment for %s: %s", asset_symbol, sentiment_result)
+            return {
+                'sentiment_score': 50.0,
+                'total_articles': 0,
+                'sentiment_label': 'neutral',
+                'error': f'Sentiment error: {str(sentiment_result)}'
+            }
+        
+        return {
+            'sentiment_score': sentiment_result.get('normalized_score', 50.0),
+            'total_articles': sentiment_result.get('total_articles', 0),
+            'sentiment_label': sentiment_result.get('sentiment_label', 'neutral')
+        }
+    
+    async def _analyze_holding_sentiment(self, asset_name: str, timeframe_days: int) -> Dict:
+        """Run news sentiment analysis for a holding with the shared portfolio analyzer"""
+        nlp_analyzer = await _run_blocking(self._get_portfolio_nlp_analyzer)
+        return await nlp_analyzer.analyze_sentiment_async(asset_name, timeframe_days)
+    
+    @staticmethod
+    def _fetch_holdings_market_data(symbols: List[str], timeframe_days: int) -> Dict:
+        """
+        Download price history for several holdings in one yfinance request and compute
+        their statistics column-wise over the whole frame (blocking, run on a worker thread)
+        
+        Returns:
+            Dict mapping each symbol that returned data to its market statistics
+        """
+        # Imported here so trading-decision-only callers (and web_app) don't load pandas/yfinance
+        import pandas as pd
+        import yfinance as yf
+        
+        data = yf.download(symbols, period=f"{timeframe_days}d", group_by='ticker',
+                           threads=True, progress=False)
+        
+        if data.columns.nlevels == 1:
+            # Single symbol without a ticker column level
+            data = pd.concat({symbols[0]: data}, axis=1)
+        
+        # One (dates x symbols) frame per field; dates are aligned across markets, so
+        # every reduction below skips the NaN rows of symbols that didn't trade that day
+        closes = data.xs('Close', level=1, axis=1)
+        tickers = closes.columns
+        highs = data.xs('High', level=1, axis=1).reindex(columns=tickers)
+        lows = data.xs('Low', level=1, axis=1).reindex(columns=tickers)
+        volumes = data.xs('Volume', level=1, axis=1).reindex(columns=tickers)
+        
+        filled_closes = closes.ffill()
+        first_close = closes.bfill().iloc[0]
+        last_close = filled_closes.iloc[-1]
+        # Returns against the previous traded close, like pct_change() on each symbol's own rows
+        daily_returns = closes / filled_closes.shift(1) - 1
+        
+        stats = zip(
+            tickers,
+            last_close.to_numpy(dtype=float).tolist(),
+            ((last_close - first_close) / first_close * 100).to_numpy(dtype=float).tolist(),
+            volumes.mean().to_numpy(dtype=float).tolist(),
+            highs.max().to_numpy(dtype=float).tolist(),
+            lows.min().to_numpy(dtype=float).tolist(),
+            (daily_returns.std() * 100).to_numpy(dtype=float).tolist(),
+            closes.count().tolist()
+        )
+        return {
+            symbol: {
+                'current_price': current_price,
+                'price_change_percentage': price_change,
+                'volume_avg': volume_avg,
+                'high_52w': high,
+                'low_52w': low,
+                'volatility': volatility,
+                'data_points': data_points
+            }
+            for symbol, current_price, price_change, volume_avg, high, low, volatility, data_points in stats
+            if data_points
+        }
+    
     async def _generate_portfolio_analysis(self, portfolio_context: Dict, holdings_data: Dict, 
-                                         sentiment_data: Dict, timeframe_days: int) -> Dict:
+                                         sentiment_data: Dict, timeframe_days: int,
+                                         all_holdings: Optional[List[Dict]] = None) -> Dict:
         """Generate comprehensive portfolio analysis using Gemini AI"""
         try:
+            if all_holdings is None:
+                all_holdings = [holding for portfolio in portfolio_context.get('portfolios', [])
+                                for holding in portfolio.get('holdings', [])]
+            
             # Create comprehensive prompt for portfolio analysis
             prompt = self._create_portfolio_analysis_prompt(
-                portfolio_context, holdings_data, sentiment_data, timeframe_days
+                portfolio_context, holdings_data, sentiment_data, timeframe_days, all_holdings
             )
             
+            cache_key = _prompt_cache_key(prompt)
+            with _portfolio_analysis_cache_lock:
+                cached_analysis = _portfolio_analysis_cache.get(cache_key)
+            if cached_analysis is not None:
+                logger.info("Using cached portfolio analysis")
+                return copy.deepcopy(cached_analysis)
+            
+            # An earlier run may have analyzed the same holdings, prices and sentiment
+            fingerprint_key = "portfolio_analysis:" + _portfolio_fingerprint(
+                all_holdings, holdings_data, sentiment_data, timeframe_days
+            )
+            stored_analysis = _disk_cache_get(fingerprint_key)
+            if stored_analysis is not None:
+                logger.info("Using stored portfolio analysis for unchanged holdings")
+                with _portfolio_analysis_cache_lock:
+                    _portfolio_analysis_cache[cache_key] = copy.deepcopy(stored_analysis)
+                return stored_analysis
+            
             logger.info("Generating portfolio analysis with Gemini AI")
-            response = self.model.generate_content(prompt)
+            response_text = await self._generate_json_async(prompt, model=self.portfolio_model)
             
-            if not response:
+            if not response_text:
                 return self._create_fallback_portfolio_analysis(portfolio_context, holdings_data, sentiment_data)
             
             # Parse the response
-            analysis_result = self._parse_portfolio_analysis_response(response.text)
+            analysis_result = self._parse_portfolio_analysis_response(response_text)
+            
+            # Text-only and unparseable answers carry the raw response; ask Gemini again next time
+            if 'raw_response' not in analysis_result:
+                with _portfolio_analysis_cache_lock:
+                    _portfolio_analysis_cache[cache_key] = copy.deepcopy(analysis_result)
+                _disk_cache_set(fingerprint_key, analysis_result)
             
             return analysis_result
             
         except Exception as e:
-            logger.error(f"Error generating portfolio analysis: {e}")
+            logger.error("Error generating portfolio analysis: %s", e)
             return self._create_fallback_portfolio_analysis(portfolio_context, holdings_data, sentiment_data)
     
     def _create_portfolio_analysis_prompt(self, portfolio_context: Dict, holdings_data: Dict, 
-                                        sentiment_data: Dict, timeframe_days: int) -> str:
-        """Create comprehensive prompt for portfolio analysis"""
+                                        sentiment_data: Dict, timeframe_days: int,
+                                        all_holdings: Optional[List[Dict]] = None) -> str:
+        """
+        Create comprehensive prompt for portfolio analysis
+        
+        Args:
+            all_holdings: Holdings of every portfolio in the context, if the caller already
+                flattened them
+        """
+        if all_holdings is None:
+            all_holdings = [holding for portfolio in portfolio_context.get('portfolios', [])
+                            for holding in portfolio.get('holdings', [])]
         
         # Portfolio summary
         total_value = portfolio_context.get('total_value', 0)
         total_cost = portfolio_context.get('total_cost', 0)
         total_gain_loss = portfolio_context.get('total_gain_loss', 0)
-        # Calculate total holdings count
-        holdings_count = 0
-        for portfolio in portfolio_context.get('portfolios', []):
-            holdings_count += len(portfolio.get('holdings', []))
+        holdings_count = len(all_holdings)
         
-        prompt = f"""
-You are a professional financial advisor analyzing a complete investment portfolio. Provide a comprehensive analysis in JSON format.
-
+        # Fixed instructions live in the portfolio model's system instruction
+        parts = [f"""
 PORTFOLIO OVERVIEW:
 - Total Portfolio Value: ${total_value:,.2f}
 - Total Cost Basis: ${total_cost:,.2f}
@@ -1128,13 +2163,9 @@ PORTFOLIO OVERVIEW:
 - Analysis Timeframe: {timeframe_days} days
 
 HOLDINGS DETAILED ANALYSIS:
-"""
+"""]
         
         # Add detailed analysis for each holding
-        all_holdings = []
-        for portfolio in portfolio_context.get('portfolios', []):
-            all_holdings.extend(portfolio.get('holdings', []))
-        
         for holding in all_holdings:
             asset_symbol = holding['asset_symbol']
             asset_name = holding.get('asset_name', asset_symbol)
@@ -1148,7 +2179,7 @@ HOLDINGS DETAILED ANALYSIS:
             market_data = holdings_data.get(asset_symbol, {})
             sentiment_info = sentiment_data.get(asset_symbol, {})
             
-            prompt += f"""
+            parts.append(f"""
 {asset_symbol} ({asset_name}):
 - Position: {quantity} shares @ ${avg_cost:.2f} avg cost
 - Current Value: ${current_value:,.2f}
@@ -1159,86 +2190,23 @@ HOLDINGS DETAILED ANALYSIS:
 - Sentiment Score: {sentiment_info.get('sentiment_score', 50):.1f}/100
 - News Articles Analyzed: {sentiment_info.get('total_articles', 0)}
 - Sentiment: {sentiment_info.get('sentiment_label', 'neutral')}
-"""
+""")
         
-        prompt += f"""
-
-ANALYSIS REQUIREMENTS:
-Provide a comprehensive portfolio analysis in the following JSON format:
-
-{{
-    "overall_assessment": {{
-        "portfolio_health": "EXCELLENT|GOOD|FAIR|POOR",
-        "risk_level": "LOW|MEDIUM|HIGH",
-        "diversification_score": "0-100",
-        "performance_rating": "A|B|C|D|F"
-    }},
-    "key_metrics": {{
-        "total_return_percentage": "calculated percentage",
-        "best_performer": "asset_symbol with best performance",
-        "worst_performer": "asset_symbol with worst performance",
-        "most_volatile": "asset_symbol with highest volatility",
-        "least_volatile": "asset_symbol with lowest volatility"
-    }},
-    "sector_analysis": {{
-        "sector_allocation": "breakdown by sector/asset type",
-        "concentration_risk": "assessment of concentration",
-        "diversification_recommendations": "specific recommendations"
-    }},
-    "individual_holdings_analysis": {{
-        "strong_holds": ["list of assets to maintain or increase"],
-        "weak_holds": ["list of assets to reduce or sell"],
-        "new_opportunities": ["suggested new positions"],
-        "position_sizing_recommendations": "specific recommendations for each holding"
-    }},
-    "risk_assessment": {{
-        "market_risk": "assessment of overall market exposure",
-        "concentration_risk": "risk from over-concentration",
-        "volatility_risk": "portfolio volatility assessment",
-        "liquidity_risk": "liquidity concerns"
-    }},
-    "recommendations": {{
-        "immediate_actions": ["specific actions to take now"],
-        "rebalancing_suggestions": ["how to rebalance the portfolio"],
-        "new_investments": ["suggested new positions"],
-        "exit_strategies": ["positions to consider selling"]
-    }},
-    "market_outlook": {{
-        "overall_sentiment": "BULLISH|BEARISH|NEUTRAL",
-        "key_drivers": ["main factors affecting portfolio"],
-        "sector_rotation_opportunities": ["sectors to rotate into/out of"],
-        "economic_indicators_impact": "how economic factors affect this portfolio"
-    }},
-    "executive_summary": "2-3 sentence summary of portfolio status and key recommendations"
-}}
-
-GUIDELINES:
-1. Be specific and actionable in all recommendations
-2. Consider the current market sentiment and economic conditions
-3. Focus on risk-adjusted returns and diversification
-4. Provide clear rationale for all recommendations
-5. Consider tax implications of any suggested changes
-6. Balance growth opportunities with risk management
-7. Consider the investor's time horizon and risk tolerance
-8. Provide specific percentage allocations where relevant
-9. Consider correlation between holdings
-10. Factor in transaction costs for rebalancing suggestions
-11. Be extremely objective, do not be biased towards any particular asset or any action
-
+        parts.append("""
 Generate the analysis now:
-"""
+""")
         
-        return prompt
+        return "".join(parts)
     
     def _parse_portfolio_analysis_response(self, response_text: str) -> Dict:
         """Parse Gemini's portfolio analysis response"""
         try:
-            # Try to extract JSON from the response
-            import re
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if json_match:
-                json_str = json_match.group()
-                return json.loads(json_str)
+            # Decode the JSON object in the response, if there is one
+            if '{' in response_text:
+                analysis = _loads_model_json(_strip_code_fence(response_text))
+                if not isinstance(analysis, dict):
+                    raise ValueError("Invalid portfolio analysis format")
+                return analysis
             else:
                 # If no JSON found, create structured response from text
                 return {
@@ -1252,7 +2220,7 @@ Generate the analysis now:
                     'raw_response': response_text
                 }
         except Exception as e:
-            logger.error(f"Error parsing portfolio analysis response: {e}")
+            logger.error("Error parsing portfolio analysis response: %s", e)
             return {
                 'overall_assessment': {
                     'portfolio_health': 'FAIR',
@@ -5,21 +5,20 @@ Orchestrates NLP sentiment analysis, historical data analysis, and AI-powered tr
 import asyncio
 import argparse
 import logging
-from datetime import datetime
+from datetime import datetime, timezone
+from functools import lru_cache
 from typing import List, Dict, Optional
-import json
+import orjson
 import sys
 import os
+from collections import Counter
 from pathlib import Path
 
 # Add current directory to Python path
 sys.path.append(str(Path(__file__).parent))
 
 from config import Config
-from nlp_analyzer import CommodityNLPAnalyzer
-from data_analyzer import CommodityDataAnalyzer
-from gemini_advisor import GeminiCommodityAdvisor
-from email_service import EmailService
+from utils import FileCache, create_pooled_session
 
 logging.basicConfig(
     level=logging.INFO,
@@ -27,22 +26,65 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Saved results embed numpy values and non-string keys from the analyzers
+_RESULTS_JSON_OPTIONS = orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+# Asset keys by type, lowercased for case-insensitive lookups
+_COMMODITY_ASSETS = frozenset(asset.lower() for asset in Config.COMMODITY_SYMBOLS)
+_STOCK_ASSETS = frozenset(asset.lower() for asset in Config.STOCK_SYMBOLS)
+
+@lru_cache(maxsize=256)
+def _asset_type(asset: str) -> str:
+    """Classify an asset name as 'commodity', 'stock' or 'unknown'"""
+    asset_key = asset.lower()
+    if asset_key in _COMMODITY_ASSETS:
+        return 'commodity'
+    elif asset_key in _STOCK_ASSETS:
+        return 'stock'
+    else:
+        return 'unknown'
+
+# CLI output fragments, built once instead of per print
+_RULE_WIDE = "=" * 80
+_RULE_MEDIUM = "=" * 60
+_RULE_NARROW = "=" * 50
+_TYPE_ICONS = {'commodity': '📊', 'stock': '📈', 'unknown': '📋'}
+_RECOMMENDATION_ROW = "   {icon} {asset}: {decision} ({confidence:.0%})"
+
+def _is_successful_result(result: Dict) -> bool:
+    """Check whether a stage result may be cached (errors are retried on the next run)"""
+    return 'error' not in result
+
 class CommodityMarketAnalyzer:
     """
     Main application class that orchestrates the complete commodity analysis pipeline
     """
     
-    def __init__(self, website_logger=None):
+    def __init__(self, website_logger=None, initialize: bool = True):
         self.config = Config()
         self.nlp_analyzer = None
         self.data_analyzer = None
         self.gemini_advisor = None
         self.email_service = None
+        self._smtp_batch_aborted = None
         self.website_logger = website_logger
-        self._initialize_components()
+        # Recent per-stage results on disk, reused across runs (None disables it)
+        self.stage_cache = FileCache(self.config.ANALYSIS_CACHE_DIR) if self.config.ANALYSIS_CACHE_ENABLED else None
+        self.cache_ttl_override = None
+        # Assets analyzed at once by analyze_multiple_assets, to stay under API rate limits
+        self.max_concurrent_assets = self.config.MAX_CONCURRENT_REQUESTS
+        # Listing assets only needs Config, so skip loading the analysis stack
+        if initialize:
+            self._initialize_components()
     
     def _initialize_components(self):
         """Initialize all analysis components"""
+        # Imported here because the analyzers pull in slow-loading ML, data and API libraries
+        from nlp_analyzer import CommodityNLPAnalyzer
+        from data_analyzer import CommodityDataAnalyzer
+        from gemini_advisor import GeminiCommodityAdvisor
+        from email_service import EmailService, SMTPBatchAborted
+        
         try:
             logger.info("Initializing Commodity Market Analyzer...")
             
@@ -51,12 +93,13 @@ class CommodityMarketAnalyzer:
             
             # Initialize components
             self.data_analyzer = CommodityDataAnalyzer()
-            self.gemini_advisor = GeminiCommodityAdvisor()
+            self.gemini_advisor = GeminiCommodityAdvisor.get_instance()
             self.nlp_analyzer = CommodityNLPAnalyzer(
                 gemini_advisor=self.gemini_advisor,
                 website_logger=self.website_logger
             )
             self.email_service = EmailService(gemini_advisor=self.gemini_advisor)
+            self._smtp_batch_aborted = SMTPBatchAborted
             
             logger.info("All components initialized successfully")
             
@@ -66,16 +109,59 @@ class CommodityMarketAnalyzer:
     
     def _get_asset_type(self, asset: str) -> str:
         """Determine if asset is a commodity or stock"""
-        if asset.lower() in self.config.COMMODITY_SYMBOLS:
-            return 'commodity'
-        elif asset.lower() in self.config.STOCK_SYMBOLS:
-            return 'stock'
-        else:
-            return 'unknown'
+        return _asset_type(asset)
+    
+    async def _cached_stage(self, stage: str, key_parts: tuple, compute, should_cache=None):
+        """
+        Run an analysis stage through the on-disk stage cache, if enabled
+        
+        Args:
+            stage: Stage name, selecting its TTL from Config.ANALYSIS_CACHE_TTLS
+            key_parts: Values that identify the stage's result
+            compute: Zero-argument coroutine function running the stage
+            should_cache: Optional predicate deciding whether a result may be reused
+        """
+        if self.stage_cache is None:
+            return await compute()
+        
+        ttl = self.cache_ttl_override if self.cache_ttl_override is not None else self.config.ANALYSIS_CACHE_TTLS[stage]
+        key = FileCache.make_key(stage, *key_parts)
+        return await self.stage_cache.get_or_compute(stage, key, compute, ttl, should_cache)
+    
+    async def _collect_and_analyze_sentiment(self, asset: str, asset_key: str, timeframe_days: int,
+                                             http_session=None) -> Dict:
+        """Collect news articles for an asset and run NLP sentiment analysis on them"""
+        # Step 1: Collect News Articles
+        logger.info("Step 1: Collecting news articles...")
+        articles = await self._cached_stage(
+            'news', (asset_key, timeframe_days),
+            lambda: self.nlp_analyzer._collect_asset_news(asset, timeframe_days, session=http_session),
+            should_cache=bool
+        )
+        logger.info(f"Collected {len(articles)} articles for {asset}")
+        
+        # Step 2: NLP Sentiment Analysis
+        logger.info("Step 2: Performing NLP sentiment analysis...")
+        return await self._cached_stage(
+            'sentiment', (asset_key, timeframe_days),
+            lambda: self.nlp_analyzer.analyze_asset_sentiment(asset, articles),
+            should_cache=_is_successful_result
+        )
+    
+    async def _analyze_historical_data(self, asset: str, asset_key: str, timeframe_days: int) -> Dict:
+        """Run historical price data analysis for an asset"""
+        # Step 3: Historical Data Analysis
+        logger.info("Step 3: Performing historical data analysis...")
+        return await self._cached_stage(
+            'data', (asset_key, timeframe_days),
+            lambda: self.data_analyzer.analyze_asset_data(asset, timeframe_days),
+            should_cache=_is_successful_result
+        )
     
     async def analyze_asset(self, asset: str, timeframe_days: int = 30, 
                            send_email: bool = True, risk_tolerance: str = 'moderate', 
-                           user_email: str = None) -> Dict:
+                           user_email: str = None, http_session=None,
+                           asset_type: Optional[str] = None) -> Dict:
         """
         Perform complete analysis for a single asset (commodity or stock)
         
@@ -85,43 +171,45 @@ class CommodityMarketAnalyzer:
             send_email: Whether to send email to broker
             risk_tolerance: User's risk tolerance ('conservative', 'moderate', 'aggressive', 'very_aggressive')
             user_email: User's email for portfolio context (optional)
+            http_session: Shared aiohttp session for news collection (optional)
+            asset_type: Asset type if the caller already classified it (optional)
             
         Returns:
             Dict containing complete analysis results
         """
+        # One timestamp for the whole analysis, so success and failure results agree
+        analysis_timestamp = datetime.now(timezone.utc).isoformat()
         try:
             # Determine asset type
-            asset_type = self._get_asset_type(asset)
+            if asset_type is None:
+                asset_type = self._get_asset_type(asset)
             logger.info(f"Starting {asset_type} analysis for {asset} over {timeframe_days} days")
             
-            # Step 1: Collect News Articles
-            logger.info("Step 1: Collecting news articles...")
-            articles = await self.nlp_analyzer._collect_asset_news(asset, timeframe_days)
-            logger.info(f"Collected {len(articles)} articles for {asset}")
+            asset_key = asset.lower()
             
-            # Step 2: NLP Sentiment Analysis
-            logger.info("Step 2: Performing NLP sentiment analysis...")
-            sentiment_analysis = await self.nlp_analyzer.analyze_asset_sentiment(
-                asset, articles
+            # Steps 1-2 (news, then sentiment) and step 3 (price history) don't depend on each other
+            sentiment_analysis, data_analysis = await asyncio.gather(
+                self._collect_and_analyze_sentiment(asset, asset_key, timeframe_days, http_session),
+                self._analyze_historical_data(asset, asset_key, timeframe_days),
+                return_exceptions=True
             )
+            if isinstance(sentiment_analysis, Exception):
+                sentiment_analysis = {'error': str(sentiment_analysis)}
+            if isinstance(data_analysis, Exception):
+                data_analysis = {'error': str(data_analysis)}
             
             if 'error' in sentiment_analysis:
                 logger.warning(f"Sentiment analysis error for {asset}: {sentiment_analysis['error']}")
             else:
                 logger.info(f"Sentiment analysis completed - Score: {sentiment_analysis.get('normalized_score', 'N/A')}/100")
             
-            # Step 3: Historical Data Analysis
-            logger.info("Step 3: Performing historical data analysis...")
-            data_analysis = await self.data_analyzer.analyze_asset_data(
-                asset, timeframe_days
-            )
-            
             if 'error' in data_analysis:
-                logger.warning(f"Data analysis error for {commodity}: {data_analysis['error']}")
+                logger.warning(f"Data analysis error for {asset}: {data_analysis['error']}")
             else:
                 logger.info(f"Data analysis completed - Trend Score: {data_analysis.get('trend_score', 'N/A')}/100")
             
-            # Step 4: AI Trading Decision
+            # Step 4: AI Trading Decision (not stage-cached: the advisor caches decisions by prompt,
+            # which covers the sentiment, data and portfolio inputs)
             logger.info("Step 4: Generating AI trading decision...")
             trading_decision = await self.gemini_advisor.make_trading_decision(
                 asset, sentiment_analysis, data_analysis, timeframe_days, risk_tolerance, user_email
@@ -138,9 +226,13 @@ class CommodityMarketAnalyzer:
             email_result = None
             if send_email and 'error' not in trading_decision:
                 logger.info("Step 4: Sending email to broker...")
-                email_result = await self.email_service.send_trading_recommendation(
-                    trading_decision, sentiment_analysis, data_analysis
-                )
+                try:
+                    email_result = await self.email_service.send_trading_recommendation(
+                        trading_decision, sentiment_analysis, data_analysis
+                    )
+                except self._smtp_batch_aborted as e:
+                    logger.warning(f"Skipping email for {asset}: {e}")
+                    email_result = {'status': 'aborted', 'error': str(e)}
                 
                 if email_result.get('status') == 'success':
                     logger.info("Email sent successfully")
@@ -153,7 +245,7 @@ class CommodityMarketAnalyzer:
                 'asset_type': asset_type,
                 'timeframe_days': timeframe_days,
                 'risk_tolerance': risk_tolerance,
-                'analysis_timestamp': datetime.now().isoformat(),
+                'analysis_timestamp': analysis_timestamp,
                 'sentiment_analysis': sentiment_analysis,
                 'data_analysis': data_analysis,
                 'trading_decision': trading_decision,
@@ -170,17 +262,44 @@ class CommodityMarketAnalyzer:
                 'asset': asset,
                 'asset_type': asset_type,
                 'timeframe_days': timeframe_days,
-                'analysis_timestamp': datetime.now().isoformat(),
+                'analysis_timestamp': analysis_timestamp,
                 'error': str(e),
                 'status': 'failed'
             }
     
+    async def _send_batched_emails(self, analyses: List[Dict]):
+        """
+        Send the deferred trading recommendation emails for finished analyses in one batch
+        
+        Args:
+            analyses: Completed analyses; each gets its 'email_result' filled in
+        """
+        sendable = [
+            analysis for analysis in analyses
+            if 'error' not in analysis.get('trading_decision', {'error': None})
+        ]
+        if not sendable:
+            return
+        
+        logger.info(f"Sending {len(sendable)} trading recommendation emails to broker...")
+        email_results = await self.email_service.send_batch([
+            (analysis['trading_decision'], analysis['sentiment_analysis'], analysis['data_analysis'])
+            for analysis in sendable
+        ])
+        
+        for analysis, email_result in zip(sendable, email_results):
+            analysis['email_result'] = email_result
+            if email_result.get('status') not in ('success', None):
+                logger.error(f"Email sending failed for {analysis['asset']}: {email_result.get('error')}")
+    
     async def analyze_multiple_assets(self, assets: List[str], 
                                      timeframe_days: int = 30,
                                      send_individual_emails: bool = False,
                                      send_summary_email: bool = True,
                                      risk_tolerance: str = 'moderate',
-                                     user_email: str = None) -> Dict:
+                                     user_email: str = None,
+                                     asset_types: Optional[Dict[str, str]] = None,
+                                     batch_emails: bool = True) -> Dict:
         """
         Analyze multiple assets (commodities and/or stocks) and generate market summary
         
@@ -191,36 +310,114 @@ class CommodityMarketAnalyzer:
             send_summary_email: Send comprehensive market summary email
             risk_tolerance: User's risk tolerance level
             user_email: User's email for portfolio context (optional)
+            asset_types: Asset type by asset name, if the caller already classified them (optional)
+            batch_emails: Send individual emails together after all analyses finish, over one SMTP connection
             
         Returns:
             Dict containing all analyses and market summary
         """
+        analysis_timestamp = datetime.now(timezone.utc).isoformat()
         try:
             logger.info(f"Starting multi-asset analysis for {len(assets)} assets")
             
-            # Analyze all assets concurrently
-            tasks = []
-            for asset in assets:
-                task = self.analyze_asset(asset, timeframe_days, send_individual_emails, risk_tolerance, user_email)
-                tasks.append(task)
+            # Emails are either sent inline as each analysis finishes, or deferred and sent as one batch
+            inline_emails = send_individual_emails and not batch_emails
+            
+            # Track SMTP failures across the batch so a dead mail server fails fast
+            if inline_emails:
+                self.email_service.begin_batch(len(assets))
+            
+            # Analyze assets concurrently, a bounded number at a time
+            semaphore = asyncio.Semaphore(max(1, self.max_concurrent_assets))
+            # One connection pool for every asset's news feeds, so repeat hosts skip the TLS handshake
+            http_session = create_pooled_session()
+            
+            # Set once an analysis hits an error every other asset would hit too (e.g. a revoked API key)
+            fatal_error = asyncio.Event()
+            
+            def cancelled_result(asset: str) -> Dict:
+                return {
+                    'asset': asset,
+                    'timeframe_days': timeframe_days,
+                    'analysis_timestamp': analysis_timestamp,
+                    'error': 'Cancelled after a fatal error in another analysis',
+                    'status': 'cancelled'
+                }
+            
+            async def analyze_or_cancel(asset: str) -> Dict:
+                async with semaphore:
+                    if fatal_error.is_set():
+                        return cancelled_result(asset)
+                    
+                    analysis = asyncio.ensure_future(self.analyze_asset(
+                        asset, timeframe_days, inline_emails, risk_tolerance, user_email, http_session,
+                        asset_types.get(asset) if asset_types else None
+                    ))
+                    fatal_wait = asyncio.ensure_future(fatal_error.wait())
+                    try:
+                        done, _ = await asyncio.wait({analysis, fatal_wait}, return_when=asyncio.FIRST_COMPLETED)
+                    finally:
+                        fatal_wait.cancel()
+                        if not analysis.done():
+                            analysis.cancel()
+                    
+                    if analysis not in done:
+                        logger.warning(f"Cancelled analysis for {asset} after a fatal error")
+                        return cancelled_result(asset)
+                    
+                    result = analysis.result()
+                    if result.get('trading_decision', {}).get('fatal'):
+                        logger.error(f"Fatal error analyzing {asset}, cancelling remaining analyses")
+                        fatal_error.set()
+                    return result
+            
+            async def analyze_guarded(asset: str) -> Dict:
+                # Record ordinary per-asset failures here, so only the fatal event stops sibling analyses
+                try:
+                    return await analyze_or_cancel(asset)
+                except Exception as e:
+                    logger.error(f"Unexpected error analyzing {asset}: {e}")
+                    return {
+                        'asset': asset,
+                        'timeframe_days': timeframe_days,
+                        'analysis_timestamp': analysis_timestamp,
+                        'error': str(e),
+                        'status': 'failed'
+                    }
             
             # Wait for all analyses to complete
-            commodity_results = await asyncio.gather(*tasks, return_exceptions=True)
+            try:
+                if hasattr(asyncio, 'TaskGroup'):
+                    # Structured concurrency: the analyses never outlive this block
+                    async with asyncio.TaskGroup() as task_group:
+                        tasks = [task_group.create_task(analyze_guarded(asset)) for asset in assets]
+                    commodity_results = [task.result() for task in tasks]
+                else:
+                    commodity_results = await asyncio.gather(*(analyze_guarded(asset) for asset in assets))
+            finally:
+                await http_session.close()
+                if inline_emails:
+                    await self.email_service.close()
             
-            # Filter successful analyses
+            # Split successful and failed analyses, collecting usable trading decisions for the summary
             successful_analyses = []
             failed_analyses = []
+            trading_decisions = []
             
             for result in commodity_results:
-                if isinstance(result, Exception):
-                    failed_analyses.append({'error': str(result)})
-                elif result.get('status') == 'completed':
+                if result.get('status') == 'completed':
                     successful_analyses.append(result)
+                    trading_decision = result.get('trading_decision')
+                    if trading_decision and 'error' not in trading_decision:
+                        trading_decisions.append(trading_decision)
                 else:
                     failed_analyses.append(result)
             
             logger.info(f"Completed {len(successful_analyses)} successful analyses, {len(failed_analyses)} failed")
             
+            if send_individual_emails and batch_emails:
+                await self._send_batched_emails(successful_analyses)
+            
             # Generate market summary if we have successful analyses
             market_summary = None
             summary_email_result = None
@@ -228,12 +425,6 @@ class CommodityMarketAnalyzer:
             if successful_analyses:
                 logger.info("Generating market summary...")
                 
-                # Extract trading decisions for summary
-                trading_decisions = [
-                    analysis['trading_decision'] for analysis in successful_analyses
-                    if 'trading_decision' in analysis and 'error' not in analysis['trading_decision']
-                ]
-                
                 if trading_decisions:
                     market_summary = await self.gemini_advisor.generate_market_summary(trading_decisions)
                     
@@ -247,10 +438,11 @@ class CommodityMarketAnalyzer:
             # Compile complete results
             complete_results = {
                 'analysis_type': 'multi_commodity',
-                'commodities_requested': commodities,
+                'assets_requested': assets,
+                'commodities_requested': assets,  # Backward compatibility
                 'commodities_analyzed': len(successful_analyses),
                 'timeframe_days': timeframe_days,
-                'analysis_timestamp': datetime.now().isoformat(),
+                'analysis_timestamp': analysis_timestamp,
                 'successful_analyses': successful_analyses,
                 'failed_analyses': failed_analyses,
                 'market_summary': market_summary,
@@ -265,10 +457,11 @@ class CommodityMarketAnalyzer:
             logger.error(f"Error in multi-commodity analysis: {e}")
             return {
                 'analysis_type': 'multi_commodity',
-                'commodities_requested': commodities,
+                'assets_requested': assets,
+                'commodities_requested': assets,  # Backward compatibility
                 'error': str(e),
                 'status': 'failed',
-                'analysis_timestamp': datetime.now().isoformat()
+                'analysis_timestamp': analysis_timestamp
             }
     
     def get_available_assets(self) -> Dict[str, List[str]]:
@@ -287,20 +480,29 @@ class CommodityMarketAnalyzer:
         """Get list of available stocks for analysis"""
         return list(self.config.STOCK_SYMBOLS.keys())
     
-    def save_analysis_results(self, results: Dict, filename: Optional[str] = None) -> str:
+    def save_analysis_results(self, results: Dict, filename: Optional[str] = None, durable: bool = False) -> str:
         """
         Save analysis results to JSON file
         
+        The file is written under a temporary name and renamed into place, so an interrupted
+        save never leaves a truncated results file behind.
+        
         Args:
             results: Analysis results to save
             filename: Optional custom filename
+            durable: Flush the file to disk before renaming it
             
         Returns:
             Path to saved file
         """
         try:
             if not filename:
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+                # Name the file after the analysis it holds rather than the time it was saved
+                try:
+                    analyzed_at = datetime.fromisoformat(results['analysis_timestamp'])
+                except (KeyError, TypeError, ValueError):
+                    analyzed_at = datetime.now(timezone.utc)
+                timestamp = analyzed_at.strftime('%Y%m%d_%H%M%S')
                 commodity = results.get('commodity', 'multi_commodity')
                 filename = f"analysis_{commodity}_{timestamp}.json"
             
@@ -309,10 +511,19 @@ class CommodityMarketAnalyzer:
             results_dir.mkdir(exist_ok=True)
             
             filepath = results_dir / filename
+            tmp_path = filepath.with_suffix(filepath.suffix + '.tmp')
             
             # Save results
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(results, f, indent=2, default=str)
+            try:
+                with open(tmp_path, 'wb') as f:
+                    f.write(orjson.dumps(results, default=str, option=_RESULTS_JSON_OPTIONS))
+                    if durable:
+                        f.flush()
+                        os.fsync(f.fileno())
+                os.replace(tmp_path, filepath)
+            except BaseException:
+                tmp_path.unlink(missing_ok=True)
+                raise
             
             logger.info(f"Analysis results saved to {filepath}")
             return str(filepath)
@@ -321,6 +532,11 @@ class CommodityMarketAnalyzer:
             logger.error(f"Error saving analysis results: {e}")
             return ""
 
+def _format_asset_list(assets: List[str], symbols: Dict[str, str]) -> str:
+    """Format the numbered 'NAME (SYMBOL)' rows printed by the list commands"""
+    return "\n".join(f"{i:2d}. {asset.upper().replace('_', ' ')} ({symbols[asset]})"
+                     for i, asset in enumerate(assets, 1))
+
 def create_argument_parser():
     """Create command line argument parser"""
     parser = argparse.ArgumentParser(
@@ -372,6 +588,8 @@ Examples:
     # Analysis parameters
     parser.add_argument('--timeframe', '-t', type=int, default=30,
                        help='Analysis timeframe in days (default: 30)')
+    parser.add_argument('--max-concurrency', type=int, default=Config.MAX_CONCURRENT_REQUESTS,
+                       help=f'Maximum assets analyzed at once (default: {Config.MAX_CONCURRENT_REQUESTS})')
     
     # Email options
     parser.add_argument('--email', action='store_true',
@@ -386,9 +604,17 @@ Examples:
                        help='Save analysis results to JSON file')
     parser.add_argument('--output-file', '-o', type=str,
                        help='Custom output filename')
+    parser.add_argument('--durable', action='store_true',
+                       help='Flush saved results to disk before completing the save')
     parser.add_argument('--verbose', '-v', action='store_true',
                        help='Enable verbose logging')
     
+    # Cache options
+    parser.add_argument('--no-cache', action='store_true',
+                       help='Ignore cached news, sentiment and market data results')
+    parser.add_argument('--cache-ttl', type=int,
+                       help='Reuse cached stage results up to this many seconds old (default: per-stage TTLs)')
+    
     return parser
 
 async def main():
@@ -401,24 +627,26 @@ async def main():
         logging.getLogger().setLevel(logging.DEBUG)
     
     try:
-        # Initialize analyzer
-        analyzer = CommodityMarketAnalyzer()
+        # Initialize analyzer (list commands only read the asset tables from Config)
+        list_only = args.list_assets or args.list_commodities or args.list_stocks
+        analyzer = CommodityMarketAnalyzer(initialize=not list_only)
+        analyzer.max_concurrent_assets = args.max_concurrency
+        if args.no_cache:
+            analyzer.stage_cache = None
+        elif args.cache_ttl is not None:
+            analyzer.cache_ttl_override = args.cache_ttl
         
         # Handle list commands
         if args.list_assets:
             assets = analyzer.get_available_assets()
             print("\n🏦 Available Assets for Analysis:")
-            print("=" * 80)
+            print(_RULE_WIDE)
             
             print(f"\n📊 COMMODITIES ({len(assets['commodities'])} available):")
-            for i, commodity in enumerate(assets['commodities'], 1):
-                symbol = analyzer.config.COMMODITY_SYMBOLS[commodity]
-                print(f"{i:2d}. {commodity.upper().replace('_', ' ')} ({symbol})")
+            print(_format_asset_list(assets['commodities'], analyzer.config.COMMODITY_SYMBOLS))
             
             print(f"\n📈 STOCKS ({len(assets['stocks'])} available):")
-            for i, stock in enumerate(assets['stocks'], 1):
-                symbol = analyzer.config.STOCK_SYMBOLS[stock]
-                print(f"{i:2d}. {stock.upper().replace('_', ' ')} ({symbol})")
+            print(_format_asset_list(assets['stocks'], analyzer.config.STOCK_SYMBOLS))
             
             print(f"\n🎯 TOTAL: {len(assets['all'])} assets available")
             return
@@ -426,20 +654,16 @@ async def main():
         if args.list_commodities:
             commodities = analyzer.get_available_commodities()
             print("\n📊 Available Commodities:")
-            print("=" * 50)
-            for i, commodity in enumerate(commodities, 1):
-                symbol = analyzer.config.COMMODITY_SYMBOLS[commodity]
-                print(f"{i:2d}. {commodity.upper().replace('_', ' ')} ({symbol})")
+            print(_RULE_NARROW)
+            print(_format_asset_list(commodities, analyzer.config.COMMODITY_SYMBOLS))
             print(f"\nTotal: {len(commodities)} commodities available")
             return
         
         if args.list_stocks:
             stocks = analyzer.get_available_stocks()
             print("\n📈 Available Stocks:")
-            print("=" * 50)
-            for i, stock in enumerate(stocks, 1):
-                symbol = analyzer.config.STOCK_SYMBOLS[stock]
-                print(f"{i:2d}. {stock.upper().replace('_', ' ')} ({symbol})")
+            print(_RULE_NARROW)
+            print(_format_asset_list(stocks, analyzer.config.STOCK_SYMBOLS))
             print(f"\nTotal: {len(stocks)} stocks available")
             return
         
@@ -476,10 +700,10 @@ async def main():
             print(f"\n🔍 Starting {asset_type} analysis for {target_asset.upper()}")
             print(f"📅 Timeframe: {args.timeframe} days")
             print(f"📧 Email: {'Yes' if send_individual_emails else 'No'}")
-            print("=" * 60)
+            print(_RULE_MEDIUM)
             
             results = await analyzer.analyze_asset(
-                target_asset, args.timeframe, send_individual_emails
+                target_asset, args.timeframe, send_individual_emails, asset_type=asset_type
             )
             
             # Display results summary
@@ -509,10 +733,8 @@ async def main():
         
         elif target_assets:
             # Multiple assets analysis
-            asset_types = [analyzer._get_asset_type(asset) for asset in target_assets]
-            type_counts = {}
-            for asset_type in asset_types:
-                type_counts[asset_type] = type_counts.get(asset_type, 0) + 1
+            asset_types = {asset: analyzer._get_asset_type(asset) for asset in target_assets}
+            type_counts = Counter(asset_types[asset] for asset in target_assets)
             
             type_summary = ", ".join([f"{count} {asset_type}{'s' if count > 1 else ''}" 
                                     for asset_type, count in type_counts.items()])
@@ -523,11 +745,12 @@ async def main():
             print(f"📅 Timeframe: {args.timeframe} days")
             print(f"📧 Individual emails: {'Yes' if send_individual_emails else 'No'}")
             print(f"📧 Summary email: {'Yes' if send_summary_email else 'No'}")
-            print("=" * 80)
+            print(_RULE_WIDE)
             
             results = await analyzer.analyze_multiple_assets(
                 target_assets, args.timeframe, 
-                send_individual_emails, send_summary_email
+                send_individual_emails, send_summary_email,
+                asset_types=asset_types
             )
             
             # Display results summary
@@ -540,13 +763,17 @@ async def main():
                 print(f"❌ Failed analyses: {failed}")
                 
                 # Show individual recommendations
+                recommendation_rows = []
                 for analysis in results.get('successful_analyses', []):
-                    asset = analysis.get('asset', 'Unknown').upper()
-                    asset_type = analysis.get('asset_type', 'unknown')
-                    decision = analysis.get('trading_decision', {}).get('decision', 'UNKNOWN')
-                    confidence = analysis.get('trading_decision', {}).get('confidence', 0.0)
-                    type_icon = "📊" if asset_type == "commodity" else "📈" if asset_type == "stock" else "📋"
-                    print(f"   {type_icon} {asset}: {decision} ({confidence:.0%})")
+                    trading_decision = analysis.get('trading_decision', {})
+                    recommendation_rows.append(_RECOMMENDATION_ROW.format_map({
+                        'icon': _TYPE_ICONS.get(analysis.get('asset_type'), '📋'),
+                        'asset': analysis.get('asset', 'Unknown').upper(),
+                        'decision': trading_decision.get('decision', 'UNKNOWN'),
+                        'confidence': trading_decision.get('confidence', 0.0)
+                    }))
+                if recommendation_rows:
+                    print("\n".join(recommendation_rows))
                 
                 # Show market summary
                 market_summary = results.get('market_summary', {})
@@ -562,7 +789,7 @@ async def main():
         
         # Save results if requested
         if args.save_results:
-            filepath = analyzer.save_analysis_results(results, args.output_file)
+            filepath = analyzer.save_analysis_results(results, args.output_file, durable=args.durable)
             if filepath:
                 print(f"\n💾 Results saved to: {filepath}")
         
@@ -577,7 +804,15 @@ async def main():
     
     return 0
 
+def run_event_loop(coro):
+    """Run a coroutine on uvloop when it is installed, otherwise on the default asyncio loop"""
+    try:
+        import uvloop
+    except ImportError:
+        return asyncio.run(coro)
+    return uvloop.run(coro)
+
 if __name__ == "__main__":
     # Run the async main function
-    exit_code = asyncio.run(main())
+    exit_code = run_event_loop(main())
     sys.exit(exit_code)
@@ -2,7 +2,7 @@
 FinBERT-based NLP Analysis for Commodity Market Sentiment - Scrapy Only Version
 """
 import asyncio
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Tuple, Optional
 import pandas as pd
 import numpy as np
@@ -114,7 +114,7 @@ class CommodityNLPAnalyzer:
                 'aggregate_sentiment': aggregate_sentiment,
                 'normalized_score': normalized_score,
                 'individual_results': sentiment_results,
-                'analysis_timestamp': datetime.now().isoformat()
+                'analysis_timestamp': datetime.now(timezone.utc).isoformat()
             }
             
             logger.info(f"Sentiment analysis completed for {asset}: {aggregate_sentiment['label']} (score: {aggregate_sentiment['score']:.3f})")
@@ -124,8 +124,8 @@ class CommodityNLPAnalyzer:
             logger.error(f"Error in sentiment analysis for {asset}: {e}")
             return self._create_error_sentiment_result(asset, str(e))
     
-    async def _collect_asset_news(self, asset: str, timeframe_days: int) -> List[Dict]:
-        """Collect news articles related to the asset using Scrapy"""
+    async def _collect_asset_news(self, asset: str, timeframe_days: int, session=None) -> List[Dict]:
+        """Collect news articles related to the asset using Scrapy, optionally over a shared HTTP session"""
         if not SCRAPY_AVAILABLE:
             raise ImportError("Scrapy is required for news collection. Please install scrapy: pip install scrapy")
         
@@ -134,7 +134,8 @@ class CommodityNLPAnalyzer:
             search_term=asset,
             asset_type='commodity',
             days_back=timeframe_days,
-            max_articles=100
+            max_articles=100,
+            session=session
         )
         
         logger.info(f"Scrapy collected {len(articles)} articles for {asset}")
@@ -270,7 +271,7 @@ class CommodityNLPAnalyzer:
             'aggregate_sentiment': {'label': 'neutral', 'confidence': 0.0, 'score': 0.0},
             'normalized_score': 50.0,
             'individual_results': [],
-            'analysis_timestamp': datetime.now().isoformat(),
+            'analysis_timestamp': datetime.now(timezone.utc).isoformat(),
             'error': error_message
         }
     
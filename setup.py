@@ -111,7 +111,8 @@ def test_imports():
         'requests',
         'yfinance',
         'google.generativeai',
-        'nltk'
+        'nltk',
+        'aiosmtplib'
     ]
     
     failed_imports = []
@@ -4,18 +4,29 @@ Simplified Scrapy runner for financial news scraping
 import asyncio
 import logging
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import feedparser
 import aiohttp
 # Removed scrapy_items import - using simple dictionaries instead
 
 logger = logging.getLogger(__name__)
 
+# Sent with every feed request, so a shared session needs no scraper-specific settings
+_FEED_TIMEOUT = aiohttp.ClientTimeout(total=15)
+_FEED_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'application/rss+xml, application/xml, text/xml, */*',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive'
+}
+
 class SimpleScrapyRunner:
     """Simplified runner that uses RSS feeds and basic HTTP requests"""
     
-    def __init__(self):
-        self.session = None
+    def __init__(self, session: Optional[aiohttp.ClientSession] = None):
+        # Caller-owned session to reuse pooled connections across runs; otherwise one is opened per run
+        self.session = session
         
     async def scrape_news(self, search_term: str, asset_type: str = 'commodity', 
                          days_back: int = 7, max_articles: int = 100) -> List[Dict]:
@@ -33,7 +44,6 @@ class SimpleScrapyRunner:
         """
         logger.info(f"Starting simple scraping for '{search_term}' ({asset_type})")
         
-        articles = []
         start_date = datetime.now() - timedelta(days=days_back)
         
         # Define working RSS feeds with better rate limiting
@@ -93,37 +103,15 @@ class SimpleScrapyRunner:
             }
         ]
         
-        # Create aiohttp session with proper headers
-        timeout = aiohttp.ClientTimeout(total=15)
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'application/rss+xml, application/xml, text/xml, */*',
-            'Accept-Language': 'en-US,en;q=0.9',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive'
-        }
-        
-        async with aiohttp.ClientSession(timeout=timeout, headers=headers) as session:
-            self.session = session
-            
-            # Scrape each RSS feed with delays
-            for i, feed_info in enumerate(rss_feeds):
+        if self.session is not None and not self.session.closed:
+            articles = await self._scrape_feeds(rss_feeds, search_term, start_date, max_articles)
+        else:
+            async with aiohttp.ClientSession() as session:
+                self.session = session
                 try:
-                    # Add delay between requests to avoid rate limiting
-                    if i > 0:
-                        await asyncio.sleep(2)
-                    
-                    feed_articles = await self._scrape_rss_feed(
-                        feed_info, search_term, start_date, max_articles // len(rss_feeds)
-                    )
-                    articles.extend(feed_articles)
-                    
-                    if len(articles) >= max_articles:
-                        break
-                        
-                except Exception as e:
-                    logger.warning(f"Error scraping {feed_info['name']}: {e}")
-                    continue
+                    articles = await self._scrape_feeds(rss_feeds, search_term, start_date, max_articles)
+                finally:
+                    self.session = None
         
         # Remove duplicates and sort by date
         articles = self._deduplicate_articles(articles)
@@ -132,6 +120,32 @@ class SimpleScrapyRunner:
         logger.info(f"Simple scraping completed. Found {len(articles)} articles")
         return articles[:max_articles]
     
+    async def _scrape_feeds(self, rss_feeds: List[Dict], search_term: str,
+                            start_date: datetime, max_articles: int) -> List[Dict]:
+        """Scrape each RSS feed in turn until enough articles are collected"""
+        articles = []
+        
+        # Scrape each RSS feed with delays
+        for i, feed_info in enumerate(rss_feeds):
+            try:
+                # Add delay between requests to avoid rate limiting
+                if i > 0:
+                    await asyncio.sleep(2)
+                
+                feed_articles = await self._scrape_rss_feed(
+                    feed_info, search_term, start_date, max_articles // len(rss_feeds)
+                )
+                articles.extend(feed_articles)
+                
+                if len(articles) >= max_articles:
+                    break
+                    
+            except Exception as e:
+                logger.warning(f"Error scraping {feed_info['name']}: {e}")
+                continue
+        
+        return articles
+    
     async def _scrape_rss_feed(self, feed_info: Dict, search_term: str, 
                               start_date: datetime, max_articles: int) -> List[Dict]:
         """Scrape a single RSS feed"""
@@ -139,7 +153,7 @@ class SimpleScrapyRunner:
         
         for rss_url in feed_info['urls']:
             try:
-                async with self.session.get(rss_url) as response:
+                async with self.session.get(rss_url, headers=_FEED_HEADERS, timeout=_FEED_TIMEOUT) as response:
                     if response.status == 200:
                         content = await response.text()
                         feed = feedparser.parse(content)
@@ -235,7 +249,8 @@ class SimpleScrapyRunner:
 
 # Convenience function
 async def run_simple_scraping(search_term: str, asset_type: str = 'commodity', 
-                             days_back: int = 7, max_articles: int = 100) -> List[Dict]:
+                             days_back: int = 7, max_articles: int = 100,
+                             session: Optional[aiohttp.ClientSession] = None) -> List[Dict]:
     """
     Convenience function to run simple scraping
     
@@ -244,11 +259,12 @@ async def run_simple_scraping(search_term: str, asset_type: str = 'commodity',
         asset_type: Type of asset
         days_back: Number of days to look back
         max_articles: Maximum number of articles
+        session: Optional shared HTTP session to fetch feeds with
         
     Returns:
         List of articles in legacy format
     """
-    runner = SimpleScrapyRunner()
+    runner = SimpleScrapyRunner(session)
     return await runner.scrape_news(
         search_term=search_term,
         asset_type=asset_type,
@@ -3,14 +3,21 @@ Utility functions and error handling for the Commodity Market Analyzer
 """
 import logging
 import traceback
-from typing import Any, Dict, Optional, Callable
-from functools import wraps
+from typing import Any, Awaitable, Dict, Optional, Callable
+from functools import partial, wraps
 from datetime import datetime
 import asyncio
 import aiohttp
 from aiohttp import ClientTimeout, ClientError
 import time
 import json
+import hashlib
+import os
+import orjson
+import random
+import sqlite3
+import threading
+from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
@@ -49,8 +56,8 @@ def error_handler(default_return=None, log_error=True):
                 return await func(*args, **kwargs)
             except Exception as e:
                 if log_error:
-                    logger.error(f"Error in {func.__name__}: {e}")
-                    logger.debug(f"Traceback: {traceback.format_exc()}")
+                    logger.error("Error in %s: %s", func.__name__, e)
+                    logger.debug("Traceback: %s", traceback.format_exc())
                 
                 # Return error information in a structured format
                 if default_return is None:
@@ -68,8 +75,8 @@ def error_handler(default_return=None, log_error=True):
                 return func(*args, **kwargs)
             except Exception as e:
                 if log_error:
-                    logger.error(f"Error in {func.__name__}: {e}")
-                    logger.debug(f"Traceback: {traceback.format_exc()}")
+                    logger.error("Error in %s: %s", func.__name__, e)
+                    logger.debug("Traceback: %s", traceback.format_exc())
                 
                 if default_return is None:
                     return {
@@ -89,7 +96,7 @@ def error_handler(default_return=None, log_error=True):
     return decorator
 
 def retry_on_failure(max_attempts=3, delay=1.0, backoff_factor=2.0, 
-                    exceptions=(Exception,)):
+                    exceptions=(Exception,), jitter=False):
     """
     Decorator for retrying failed operations
     
@@ -98,6 +105,8 @@ def retry_on_failure(max_attempts=3, delay=1.0, backoff_factor=2.0,
         delay: Initial delay between retries (seconds)
         backoff_factor: Factor to multiply delay by after each failure
         exceptions: Tuple of exceptions to catch and retry
+        jitter: Sleep a random time up to the current delay, so concurrent
+            callers that failed together don't retry together
     """
     def decorator(func):
         @wraps(func)
@@ -113,11 +122,11 @@ def retry_on_failure(max_attempts=3, delay=1.0, backoff_factor=2.0,
                     if attempt == max_attempts - 1:
                         break
                     
-                    logger.warning(f"Attempt {attempt + 1} failed for {func.__name__}: {e}")
-                    await asyncio.sleep(current_delay)
+                    logger.warning("Attempt %s failed for %s: %s", attempt + 1, func.__name__, e)
+                    await asyncio.sleep(random.uniform(0, current_delay) if jitter else current_delay)
                     current_delay *= backoff_factor
             
-            logger.error(f"All {max_attempts} attempts failed for {func.__name__}")
+            logger.error("All %s attempts failed for %s", max_attempts, func.__name__)
             raise last_exception
         
         @wraps(func)
@@ -133,11 +142,11 @@ def retry_on_failure(max_attempts=3, delay=1.0, backoff_factor=2.0,
                     if attempt == max_attempts - 1:
                         break
                     
-                    logger.warning(f"Attempt {attempt + 1} failed for {func.__name__}: {e}")
-                    time.sleep(current_delay)
+                    logger.warning("Attempt %s failed for %s: %s", attempt + 1, func.__name__, e)
+                    time.sleep(random.uniform(0, current_delay) if jitter else current_delay)
                     current_delay *= backoff_factor
             
-            logger.error(f"All {max_attempts} attempts failed for {func.__name__}")
+            logger.error("All %s attempts failed for %s", max_attempts, func.__name__)
             raise last_exception
         
         if asyncio.iscoroutinefunction(func):
@@ -154,25 +163,200 @@ class RateLimiter:
         self.max_requests = max_requests
         self.time_window = time_window
         self.requests = []
+        # Guards the window so one limiter can be shared by several event loops/threads
+        self._lock = threading.Lock()
     
     async def acquire(self):
         """Acquire permission to make a request"""
-        now = time.time()
+        while True:
+            with self._lock:
+                now = time.time()
+                
+                # Remove old requests outside the time window
+                self.requests = [req_time for req_time in self.requests 
+                                if now - req_time < self.time_window]
+                
+                # Record this request if we're under the limit
+                if len(self.requests) < self.max_requests:
+                    self.requests.append(now)
+                    return
+                
+                sleep_time = self.time_window - (now - self.requests[0])
+            
+            logger.info("Rate limit reached, sleeping for %.2f seconds", sleep_time)
+            await asyncio.sleep(max(sleep_time, 0))
+
+class CircuitBreaker:
+    """Fail fast after repeated errors from a dependency, letting a trial call through after a cool-down"""
+    
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+    
+    def allow_request(self) -> bool:
+        """Check whether a call may go ahead"""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            
+            now = time.monotonic()
+            if now - self.opened_at < self.reset_timeout:
+                return False
+            
+            # Half-open: let this call through and hold everyone else back until it reports
+            self.opened_at = now
+            return True
+    
+    def record_success(self):
+        """Close the breaker after a successful call"""
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+    
+    def record_failure(self):
+        """Count a failed call, opening the breaker once the threshold is reached"""
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logger.warning("Circuit breaker opened after %s consecutive failures", self.failures)
+                self.opened_at = time.monotonic()
+
+class PersistentCache:
+    """SQLite-backed key/value cache for JSON-serializable values that survives restarts"""
+    
+    def __init__(self, path, ttl=86400):
+        self.path = path
+        self.ttl = ttl
+        self._conn = None
+        self._lock = threading.Lock()
+    
+    def _connection(self):
+        """Open the database on first use (caller holds the lock)"""
+        if self._conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)'
+            )
+            self._conn.commit()
+        return self._conn
+    
+    def get(self, key: str) -> Any:
+        """Get a cached value, or None if it is missing, expired or unreadable"""
+        try:
+            with self._lock:
+                row = self._connection().execute(
+                    'SELECT value, stored_at FROM cache WHERE key = ?', (key,)
+                ).fetchone()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning("Persistent cache read failed: %s", e)
+            return None
         
-        # Remove old requests outside the time window
-        self.requests = [req_time for req_time in self.requests 
-                        if now - req_time < self.time_window]
+        if row is None or time.time() - row[1] >= self.ttl:
+            return None
+        try:
+            return json.loads(row[0])
+        except ValueError as e:
+            logger.warning("Ignoring unreadable persistent cache entry: %s", e)
+            return None
+    
+    def set(self, key: str, value: Any):
+        """Store a value, replacing any previous entry for the key"""
+        try:
+            with self._lock:
+                conn = self._connection()
+                conn.execute(
+                    'INSERT OR REPLACE INTO cache (key, value, stored_at) VALUES (?, ?, ?)',
+                    (key, json.dumps(value), time.time())
+                )
+                conn.commit()
+        except (sqlite3.Error, OSError, TypeError, ValueError) as e:
+            # Best-effort: a value json can't serialize (e.g. numpy floats) is just not cached
+            logger.warning("Persistent cache write failed: %s", e)
+
+# Stage results carry numpy values and datetimes from the analyzers; anything else is stored as str
+_FILE_CACHE_JSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+class FileCache:
+    """On-disk cache of JSON results, one file per key in a directory per pipeline stage"""
+    
+    def __init__(self, cache_dir='.cache'):
+        self.cache_dir = Path(cache_dir)
+    
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Build a file-safe cache key from the values that identify a result"""
+        return hashlib.md5(":".join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    
+    def _path(self, stage: str, key: str) -> Path:
+        return self.cache_dir / stage / f"{key}.json"
+    
+    def get(self, stage: str, key: str, ttl: float) -> Any:
+        """Get a cached result, or None if it is missing, older than ttl seconds or unreadable"""
+        path = self._path(stage, key)
+        try:
+            if time.time() - path.stat().st_mtime >= ttl:
+                return None
+            with open(path, 'rb') as f:
+                return orjson.loads(f.read())
+        except FileNotFoundError:
+            return None
+        except (OSError, orjson.JSONDecodeError) as e:
+            logger.warning("Ignoring unreadable cache entry %s: %s", path, e)
+            return None
+    
+    def set(self, stage: str, key: str, value: Any):
+        """Store a result, replacing the previous entry atomically"""
+        path = self._path(stage, key)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                f.write(orjson.dumps(value, default=str, option=_FILE_CACHE_JSON_OPTIONS))
+            os.replace(tmp_path, path)
+        except (OSError, orjson.JSONEncodeError) as e:
+            logger.warning("Could not write cache entry %s: %s", path, e)
+            try:
+                tmp_path.unlink()
+            except OSError:
+                pass
+    
+    async def get_or_compute(self, stage: str, key: str, compute: Callable[[], Awaitable[Any]], ttl: float,
+                             should_cache: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        Return the cached result for a stage, or await compute() and cache what it returns
         
-        # Check if we're at the limit
-        if len(self.requests) >= self.max_requests:
-            sleep_time = self.time_window - (now - self.requests[0])
-            if sleep_time > 0:
-                logger.info(f"Rate limit reached, sleeping for {sleep_time:.2f} seconds")
-                await asyncio.sleep(sleep_time)
-                return await self.acquire()
+        Args:
+            stage: Pipeline stage name, used as the cache subdirectory
+            key: Cache key within the stage (see make_key)
+            compute: Zero-argument coroutine function producing the result
+            ttl: Maximum age of a reusable result in seconds
+            should_cache: Optional predicate; results it rejects (e.g. errors) are not stored
+        """
+        loop = asyncio.get_running_loop()
+        cached = await loop.run_in_executor(None, partial(self.get, stage, key, ttl))
+        if cached is not None:
+            logger.info("Using cached %s result", stage)
+            return cached
         
-        # Record this request
-        self.requests.append(now)
+        value = await compute()
+        if value is not None and (should_cache is None or should_cache(value)):
+            await loop.run_in_executor(None, partial(self.set, stage, key, value))
+        return value
+
+def create_pooled_session(timeout=30, limit=32, limit_per_host=8) -> aiohttp.ClientSession:
+    """
+    Create an HTTP session whose keep-alive connection pool is meant to be shared by many requests
+    
+    Must be called from a running event loop; the caller closes the session.
+    """
+    connector = aiohttp.TCPConnector(limit=limit, limit_per_host=limit_per_host,
+                                     ttl_dns_cache=300, keepalive_timeout=60)
+    return aiohttp.ClientSession(connector=connector, timeout=ClientTimeout(total=timeout))
 
 class SafeHTTPSession:
     """Safe HTTP session with timeouts and error handling"""
@@ -201,7 +385,7 @@ class SafeHTTPSession:
                 response.raise_for_status()
                 return response
         except Exception as e:
-            logger.error(f"HTTP GET error for {url}: {e}")
+            logger.error("HTTP GET error for %s: %s", url, e)
             raise
 
 def validate_commodity_name(commodity: str) -> str:
@@ -290,7 +474,7 @@ def safe_float_conversion(value: Any, default: float = 0.0) -> float:
             return default
         return float(value)
     except (ValueError, TypeError):
-        logger.warning(f"Failed to convert {value} to float, using default {default}")
+        logger.warning("Failed to convert %s to float, using default %s", value, default)
         return default
 
 def safe_int_conversion(value: Any, default: int = 0) -> int:
@@ -309,7 +493,7 @@ def safe_int_conversion(value: Any, default: int = 0) -> int:
             return default
         return int(float(value))  # Handle string floats like "3.0"
     except (ValueError, TypeError):
-        logger.warning(f"Failed to convert {value} to int, using default {default}")
+        logger.warning("Failed to convert %s to int, using default %s", value, default)
         return default
 
 def sanitize_filename(filename: str) -> str:
@@ -437,7 +621,7 @@ def get_system_info() -> Dict[str, Any]:
             'timestamp': datetime.now().isoformat()
         }
     except Exception as e:
-        logger.error(f"Error getting system info: {e}")
+        logger.error("Error getting system info: %s", e)
         return {'error': str(e)}
 
 class PerformanceMonitor:
@@ -450,7 +634,7 @@ class PerformanceMonitor:
     
     def __enter__(self):
         self.start_time = time.time()
-        logger.info(f"Starting {self.operation_name}")
+        logger.info("Starting %s", self.operation_name)
         return self
     
     def __exit__(self, exc_type, exc_val, exc_tb):
@@ -458,9 +642,9 @@ class PerformanceMonitor:
         duration = self.end_time - self.start_time
         
         if exc_type is None:
-            logger.info(f"Completed {self.operation_name} in {duration:.2f} seconds")
+            logger.info("Completed %s in %.2f seconds", self.operation_name, duration)
         else:
-            logger.error(f"Failed {self.operation_name} after {duration:.2f} seconds: {exc_val}")
+            logger.error("Failed %s after %.2f seconds: %s", self.operation_name, duration, exc_val)
     
     @property
     def duration(self) -> Optional[float]:
@@ -494,33 +678,33 @@ def log_function_call(func: Callable) -> Callable:
     @wraps(func)
     async def async_wrapper(*args, **kwargs):
         func_name = f"{func.__module__}.{func.__name__}"
-        logger.debug(f"Calling {func_name} with args={args[:2]}... kwargs={list(kwargs.keys())}")
+        logger.debug("Calling %s with args=%s... kwargs=%s", func_name, args[:2], list(kwargs.keys()))
         
         start_time = time.time()
         try:
             result = await func(*args, **kwargs)
             duration = time.time() - start_time
-            logger.debug(f"{func_name} completed in {duration:.3f}s")
+            logger.debug("%s completed in %.3fs", func_name, duration)
             return result
         except Exception as e:
             duration = time.time() - start_time
-            logger.error(f"{func_name} failed after {duration:.3f}s: {e}")
+            logger.error("%s failed after %.3fs: %s", func_name, duration, e)
             raise
     
     @wraps(func)
     def sync_wrapper(*args, **kwargs):
         func_name = f"{func.__module__}.{func.__name__}"
-        logger.debug(f"Calling {func_name} with args={args[:2]}... kwargs={list(kwargs.keys())}")
+        logger.debug("Calling %s with args=%s... kwargs=%s", func_name, args[:2], list(kwargs.keys()))
         
         start_time = time.time()
         try:
             result = func(*args, **kwargs)
             duration = time.time() - start_time
-            logger.debug(f"{func_name} completed in {duration:.3f}s")
+            logger.debug("%s completed in %.3fs", func_name, duration)
             return result
         except Exception as e:
             duration = time.time() - start_time
-            logger.error(f"{func_name} failed after {duration:.3f}s: {e}")
+            logger.error("%s failed after %.3fs: %s", func_name, duration, e)
             raise
     
     if asyncio.iscoroutinefunction(func):
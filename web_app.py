@@ -20,6 +20,7 @@ import sys
 sys.path.append(str(Path(__file__).parent))
 
 from main import CommodityMarketAnalyzer
+from gemini_advisor import invalidate_portfolio_context
 from config import Config
 from scheduler import scheduler
 from models import db, User, Portfolio, Holding, Transaction, AnalysisRecommendation
@@ -551,6 +552,7 @@ def portfolios():
             )
             
             if success:
+                invalidate_portfolio_context(current_user.email)
                 return jsonify({
                     'success': True,
                     'message': message,
@@ -592,6 +594,7 @@ def portfolio_detail(portfolio_id):
             )
             
             if success:
+                invalidate_portfolio_context(current_user.email)
                 return jsonify({'success': True, 'message': message})
             else:
                 return jsonify({'error': message}), 400
@@ -605,6 +608,7 @@ def portfolio_detail(portfolio_id):
             success, message = PortfolioService.delete_portfolio(current_user.id, portfolio_id)
             
             if success:
+                invalidate_portfolio_context(current_user.email)
                 return jsonify({'success': True, 'message': message})
             else:
                 return jsonify({'error': message}), 400
@@ -651,6 +655,7 @@ def portfolio_holdings(portfolio_id):
             )
             
             if success:
+                invalidate_portfolio_context(current_user.email)
                 return jsonify({
                     'success': True,
                     'message': message,
@@ -688,6 +693,7 @@ def remove_holding(portfolio_id, asset_symbol):
         )
         
         if success:
+            invalidate_portfolio_context(current_user.email)
             return jsonify({'success': True, 'message': message})
         else:
             return jsonify({'error': message}), 400
@@ -725,6 +731,7 @@ def update_portfolio_prices(portfolio_id):
         )
         
         if success:
+            invalidate_portfolio_context(current_user.email)
             return jsonify({'success': True, 'message': message})
         else:
             return jsonify({'error': message}), 400
@@ -780,6 +787,7 @@ def fetch_portfolio_prices(portfolio_id):
         )
         
         if success:
+            invalidate_portfolio_context(current_user.email)
             return jsonify({
                 'success': True, 
                 'message': f'Updated prices for {updated_count} holdings',